@@ -1,38 +1,224 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 import io
 import zipfile
 from datetime import datetime
-import pycountry
 import xml.etree.ElementTree as ET
 import json
-from fuzzywuzzy import fuzz
 import re
+import concurrent.futures
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import streamlit as st
 
+try:
+    import orjson # Optional: parses large JSON responses several times faster than the stdlib
+except ImportError:
+    orjson = None
+
+# Upper bound on concurrent HTTP requests issued to the Kobo server; thread pools are never nested,
+# so this also sizes the session's keep-alive connection pool
+MAX_WORKERS = 8
+
+# Submissions requested per page; bounds how much raw JSON is held in memory per response
+SUBMISSIONS_PAGE_SIZE = 1000
+
+# Minimum seconds between progress updates pushed to the browser; each update is a websocket round trip
+PROGRESS_INTERVAL = 0.1
+
+# Columns of the asset metadata DataFrame returned by the asset fetchers
+ASSET_COLUMNS = [
+    "Name", "UID", "Submission Count", "Date Created", "Date Modified", "Country Label", "Country Code",
+    "Source View UID", "Source View Name", "Is Deployed", "Is Archived", "Status", "Owner Username",
+    "Sector", "Operational Purpose", "Collects PII", "Description"
+]
+
+# Kobo query filter that lets the server drop non-survey assets (blocks, templates, ...) before serializing them
+SURVEY_ONLY_QUERY = "&q=asset_type:survey"
+
+
+@st.cache_resource(show_spinner=False)
+def get_session(token):
+    """
+    Returns a pooled requests.Session authenticated with the given API token.
+    Cached per token so keep-alive connections (and TLS handshakes) are reused across calls and reruns.
+    Transient failures (429 and 5xx) are retried with backoff, and compressed responses are always requested.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4, # Distinct hosts kept in the pool; the app talks to one Kobo server
+        pool_maxsize=MAX_WORKERS,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Authorization": f"Token {token}",
+        "Accept": "application/json",
+        "Accept-Encoding": requests.utils.DEFAULT_ACCEPT_ENCODING # gzip, deflate (+ br/zstd when supported)
+    })
+    return session
+
+
+def progress_due(last_update, final=False):
+    """
+    Tells whether a progress update should be sent: at most once per PROGRESS_INTERVAL, but always for the final frame.
+    """
+    return final or time.monotonic() - last_update >= PROGRESS_INTERVAL
+
+
+def _loads(content):
+    """
+    Decodes a JSON response body, using orjson when it is installed.
+    Both decoders raise json.JSONDecodeError subclasses on invalid input.
+    """
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _get_json_page(url, token, timeout):
+    """
+    GETs one page of a paginated list endpoint and returns the decoded JSON.
+    Cached for 15 minutes so Streamlit reruns replay list fetches without network round trips;
+    request errors propagate and are therefore never cached.
+    """
+    res = get_session(token).get(url, timeout=timeout)
+    res.raise_for_status()
+    return _loads(res.content)
+
+
+def _fetch_json(session, url, timeout):
+    """
+    GETs a URL with the shared session and returns the decoded JSON. Safe to call from worker threads.
+    """
+    res = session.get(url, timeout=timeout)
+    res.raise_for_status()
+    return _loads(res.content)
+
+
+def _fetch_submissions_page(session, url):
+    """
+    Fetches one page of submissions and flattens it straight into a DataFrame, so the raw page can be freed early.
+    """
+    return pd.json_normalize(_fetch_json(session, url, timeout=180).get("results", []))
+
+
+def _remaining_page_urls(next_url, count):
+    """
+    Expands the 'next' link of a first page into the URLs of every remaining page, so they can be fetched concurrently.
+    Kobo pages list endpoints with limit/offset and the data endpoint with limit/start.
+    Returns None when the link carries no usable paging parameters; callers then follow 'next' links sequentially.
+    """
+    parts = urlsplit(next_url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    offset_param = next((param for param in ("start", "offset") if param in query), None)
+    if offset_param is None or not query.get("limit", "").isdigit() or not query[offset_param].isdigit():
+        return None
+
+    page_size = int(query["limit"])
+    if page_size <= 0:
+        return None
+
+    page_urls = []
+    for offset in range(int(query[offset_param]), count, page_size):
+        query[offset_param] = str(offset)
+        page_urls.append(urlunsplit(parts._replace(query=urlencode(query))))
+    return page_urls
+
+
+def _iter_list_pages(first_url, token, timeout):
+    """
+    Yields the decoded pages of a paginated list endpoint in order; pages are cached by _get_json_page.
+    The first page is fetched alone to learn the total count, then the remaining pages are fetched concurrently.
+    Falls back to following 'next' links when they cannot be expanded. Request and decoding errors propagate.
+    """
+    data = _get_json_page(first_url, token, timeout)
+    yield data
+
+    next_url = data.get("next")
+    if not next_url:
+        return
+
+    page_urls = _remaining_page_urls(next_url, data.get("count", 0))
+    if page_urls is None:
+        while next_url:
+            data = _get_json_page(next_url, token, timeout)
+            yield data
+            next_url = data.get("next")
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        yield from ex.map(lambda url: _get_json_page(url, token, timeout), page_urls)
+
+
+def _column(df, name):
+    """
+    Returns df[name] as an object Series, or an all-None Series when no record carried that key.
+    """
+    if name in df.columns:
+        return df[name].astype(object)
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _build_assets_frame(raw_assets, source_view_uid, source_view_name):
+    """
+    Turns raw asset JSON dicts into the app's asset metadata DataFrame.
+    Columns are derived in bulk instead of assembling one dict per asset.
+    """
+    if not raw_assets:
+        return pd.DataFrame(columns=ASSET_COLUMNS)
+
+    assets = pd.DataFrame.from_records(raw_assets)
+    settings = pd.DataFrame.from_records(
+        [s if isinstance(s, dict) else {} for s in _column(assets, "settings")],
+        index=assets.index
+    )
+    first_country = _column(settings, "country").str[0].astype(object)
+
+    status = np.where(
+        _column(assets, "deployment_status").eq("deployed"), "Deployed",
+        np.where(_column(assets, "is_archived").eq(True), "Archived", "Draft")
+    )
+
+    records = pd.DataFrame({
+        "Name": _column(assets, "name"),
+        "UID": _column(assets, "uid"),
+        "Submission Count": pd.to_numeric(_column(assets, "deployment__submission_count"), errors="coerce").fillna(0).astype("int32"),
+        "Date Created": _column(assets, "date_created"),
+        "Date Modified": _column(assets, "date_modified"),
+        "Country Label": first_country.str.get("label").fillna(""),
+        "Country Code": first_country.str.get("value").fillna("").astype("category"),
+        "Source View UID": source_view_uid,
+        "Source View Name": source_view_name,
+        "Is Deployed": _column(assets, "is_deployed").eq(True),
+        "Is Archived": _column(assets, "is_archived").eq(True),
+        "Status": status,
+        "Owner Username": _column(assets, "owner__username"),
+        "Sector": _column(settings, "sector"),
+        "Operational Purpose": _column(settings, "operational_purpose").str.get("label"),
+        "Collects PII": _column(settings, "collects_pii").str.get("label"),
+        "Description": _column(settings, "description").fillna("")
+    }, columns=ASSET_COLUMNS)
+    return records
+
 
 def fetch_all_project_views_metadata(token, server_url, progress_bar=None, status_text=None):
     """
     Fetches a list of all project views available to the user via the KoboToolbox API.
-    Handles pagination to get all views.
+    Handles pagination to get all views; pages after the first are fetched concurrently by _iter_list_pages.
     """
-    headers = {
-        "Authorization": f"Token {token}",
-        "Accept": "application/json"
-    }
     all_views = []
     total_views_count = None
+    last_reported = 0
     
     pb = progress_bar if progress_bar is not None else st.progress(0)
     st_text = status_text if status_text is not None else st.empty()
 
-    next_url = f"{server_url}/api/v2/project-views/?format=json"
-    while next_url:
-        try:
-            res = requests.get(next_url, headers=headers, timeout=10)
-            res.raise_for_status()
-            data = res.json()
-
+    try:
+        for data in _iter_list_pages(f"{server_url}/api/v2/project-views/?format=json", token, timeout=10):
             if total_views_count is None:
                 total_views_count = data.get("count", 0)
                 if total_views_count == 0:
@@ -44,132 +230,165 @@ def fetch_all_project_views_metadata(token, server_url, progress_bar=None, statu
             for pv in results:
                 if not isinstance(pv, dict):
                     st.warning(f"Skipping unexpected non-dictionary project view item: {pv}")
-                    continue
-
-                all_views.append({
-                    "View Name": pv.get("name"),
-                    "View UID": pv.get("uid"),
-                    "URL": pv.get("url")
-                })
-            
-            current_progress = len(all_views) / total_views_count if total_views_count > 0 else 0
-            st_text.text(f"Fetching project views: {len(all_views)} of {total_views_count} ({min(100, int(current_progress * 100))}%)")
-            pb.progress(current_progress)
 
-            next_url = data.get("next")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to fetch project views: {e}")
-            pb.empty()
-            st_text.empty()
-            return []
+            all_views.extend(
+                {"View Name": pv.get("name"), "View UID": pv.get("uid"), "URL": pv.get("url")}
+                for pv in results if isinstance(pv, dict)
+            )
+
+            # Only push progress to the browser every ~2% (and on the last page) to limit websocket chatter
+            if not data.get("next") or len(all_views) - last_reported >= max(1, total_views_count // 50):
+                last_reported = len(all_views)
+                current_progress = min(1.0, len(all_views) / total_views_count) if total_views_count > 0 else 0
+                st_text.text(f"Fetching project views: {len(all_views)} of {total_views_count} ({int(current_progress * 100)}%)")
+                pb.progress(current_progress)
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        st.error(f"Failed to fetch project views: {e}")
+        pb.empty()
+        st_text.empty()
+        return []
     
     return all_views
 
 
+def _fetch_view_page(view_uid, url, token, include_surveys=True):
+    """
+    Fetches one page of a project view's assets; the page itself is cached by _get_json_page.
+    Returns (assets, warnings, next_url, count). Runs inside a worker thread, so it never touches Streamlit;
+    request and decoding errors propagate to the caller.
+    """
+    data = _get_json_page(url, token, timeout=30)
+    assets = []
+    warnings = []
+
+    for asset in data.get("results", []):
+        if not isinstance(asset, dict):
+            warnings.append(f"Skipping unexpected non-dictionary asset in view '{view_uid}': {asset}")
+            continue
+
+        if include_surveys and asset.get("asset_type") != "survey":
+            continue
+
+        assets.append(asset)
+
+    return assets, warnings, data.get("next"), data.get("count", 0)
+
+
+def _follow_view_pages(view_uid, next_url, token, include_surveys=True):
+    """
+    Pages through the rest of a view by following 'next' links, for when they cannot be expanded up front.
+    Returns (assets, warnings, None, 0) so it can be handled like a single page.
+    """
+    raw_assets = []
+    warnings = []
+
+    while next_url:
+        try:
+            assets, page_warnings, next_url, _ = _fetch_view_page(view_uid, next_url, token, include_surveys)
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            warnings.append(f"Could not fetch assets for project view '{view_uid}': {e}")
+            break
+        raw_assets.extend(assets)
+        warnings.extend(page_warnings)
+
+    return raw_assets, warnings, None, 0
+
+
 def fetch_assets_for_project_views(selected_view_uids, token, server_url, include_surveys=True, progress_bar=None, status_text=None):
     """
-    Fetches assets (projects) from a list of selected project views.
-    Gathers metadata for each asset and appends it to a list.
+    Fetches assets (projects) from a list of selected project views and returns them as one DataFrame.
+    The first page of every view is fetched concurrently to learn each view's size; the remaining pages of all views
+    then go to the same thread pool as individual tasks, so one large view does not finish alone at the end.
+    Pages are cached by _get_json_page, so reloading the same views within 15 minutes makes no network requests.
+    Results are merged and progress is reported from the main thread.
     """
-    headers = {
-        "Authorization": f"Token {token}",
-        "Accept": "application/json"
-    }
-    all_assets_from_views = []
+    view_name_by_uid = {pv["View UID"]: pv["View Name"] for pv in st.session_state.available_project_views}
+    pages_by_view = {view_uid: {} for view_uid in selected_view_uids} # Page index -> assets, reassembled in order
+    pending_by_view = {view_uid: 1 for view_uid in selected_view_uids}
     pb = progress_bar if progress_bar is not None else st.progress(0)
     st_text = status_text if status_text is not None else st.empty()
 
     total_views = len(selected_view_uids)
-    
-    for i, view_uid in enumerate(selected_view_uids):
-        next_asset_url = f"{server_url}/api/v2/project-views/{view_uid}/assets/?format=json"
-        total_assets_in_current_view = None
-        current_view_assets_fetched = 0
-
-        while next_asset_url:
-            try:
-                res = requests.get(next_asset_url, headers=headers, timeout=30)
-                res.raise_for_status()
-                data = res.json()
-
-                if total_assets_in_current_view is None:
-                    total_assets_in_current_view = data.get("count", 0)
-
-                for asset in data.get("results", []):
-                    if not isinstance(asset, dict):
-                        st.warning(f"Skipping unexpected non-dictionary asset in view '{view_uid}': {asset}")
-                        continue
-
-                    if include_surveys and asset.get("asset_type") != "survey":
-                        continue
-
-                    settings = asset.get("settings", {})
-                    country_list = settings.get("country", [])
-                    sector_data = settings.get("sector")
-
-                    country_label = country_list[0].get("label", "") if country_list else ""
-                    country_code = country_list[0].get("value", "") if country_list else ""
-
-                    status_label = "Deployed" if asset.get("deployment_status") == "deployed" else "Archived" if asset.get("is_archived") else "Draft"
-
-                    all_assets_from_views.append({
-                        "Name": asset.get("name"),
-                        "UID": asset.get("uid"),
-                        "Submission Count": asset.get("deployment__submission_count", 0),
-                        "Date Created": asset.get("date_created"),
-                        "Date Modified": asset.get("date_modified"),
-                        "Country Label": country_label,
-                        "Country Code": country_code,
-                        "Source View UID": view_uid,
-                        "Source View Name": next((pv["View Name"] for pv in st.session_state.available_project_views if pv["View UID"] == view_uid), "Unknown"),
-                        "Is Deployed": asset.get("is_deployed", False),
-                        "Is Archived": asset.get("is_archived", False),
-                        "Status": status_label,
-                        "Owner Username": asset.get("owner__username"),
-                        "Sector": sector_data,
-                        "Operational Purpose": (settings.get("operational_purpose") or {}).get("label"),
-                        "Collects PII": (settings.get("collects_pii") or {}).get("label"),
-                        "Description": settings.get("description", "")
-                    })
-
-                current_view_assets_fetched += len(data.get("results", []))
-                next_asset_url = data.get("next")
-
-                current_view_progress = current_view_assets_fetched / total_assets_in_current_view if total_assets_in_current_view else 0
-                st_text.text(f"View {i+1}/{total_views}: Loading assets for '{view_uid}' - {current_view_assets_fetched} of {total_assets_in_current_view}")
-                pb.progress(min(1.0, (i + current_view_progress) / total_views))
-
-            except requests.exceptions.RequestException as e:
-                st.warning(f"Could not fetch assets for project view '{view_uid}': {e}")
-                next_asset_url = None
-    
+    views_done = 0
+    last_ui = 0.0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {}
+        for view_uid in selected_view_uids:
+            first_url = f"{server_url}/api/v2/project-views/{view_uid}/assets/?format=json"
+            if include_surveys:
+                first_url += SURVEY_ONLY_QUERY
+            futures[ex.submit(_fetch_view_page, view_uid, first_url, token, include_surveys)] = (view_uid, 0)
+
+        while futures:
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                view_uid, page_index = futures.pop(future)
+                pending_by_view[view_uid] -= 1
+                try:
+                    assets, warnings, next_url, count = future.result()
+                except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+                    assets, warnings, next_url = [], [f"Could not fetch assets for project view '{view_uid}': {e}"], None
+                for warning in warnings:
+                    st.warning(warning)
+                pages_by_view[view_uid][page_index] = assets
+
+                # The first page tells how large the view is; queue all of its remaining pages at once
+                if page_index == 0 and next_url:
+                    page_urls = _remaining_page_urls(next_url, count)
+                    if page_urls is None:
+                        futures[ex.submit(_follow_view_pages, view_uid, next_url, token, include_surveys)] = (view_uid, 1)
+                        pending_by_view[view_uid] += 1
+                    else:
+                        for i, page_url in enumerate(page_urls, start=1):
+                            futures[ex.submit(_fetch_view_page, view_uid, page_url, token, include_surveys)] = (view_uid, i)
+                        pending_by_view[view_uid] += len(page_urls)
+
+                if pending_by_view[view_uid] == 0:
+                    views_done += 1
+                    if progress_due(last_ui, final=views_done == total_views):
+                        view_asset_count = sum(len(page) for page in pages_by_view[view_uid].values())
+                        st_text.text(f"Loaded {views_done}/{total_views} views: '{view_uid}' returned {view_asset_count} assets")
+                        pb.progress(views_done / total_views)
+                        last_ui = time.monotonic()
+
+    # Merge in selection order so duplicate assets keep the source view of the first selected view
+    view_frames = []
+    for view_uid in selected_view_uids:
+        pages = pages_by_view[view_uid]
+        raw_assets = [asset for page_index in sorted(pages) for asset in pages[page_index]]
+        if raw_assets:
+            view_frames.append(_build_assets_frame(raw_assets, view_uid, view_name_by_uid.get(view_uid, "Unknown")))
+    if not view_frames:
+        return pd.DataFrame(columns=ASSET_COLUMNS)
+    all_assets_from_views = pd.concat(view_frames, ignore_index=True)
+    all_assets_from_views["Country Code"] = all_assets_from_views["Country Code"].astype("category") # concat drops mismatched categories
     return all_assets_from_views
 
 
 def fetch_all_assets_metadata(token, server_url, include_surveys=True, progress_bar=None, status_text=None):
     """
-    Fetches metadata for all assets directly from the /api/v2/assets endpoint.
-    Handles pagination and filters for 'survey' type assets if specified.
+    Fetches metadata for all assets directly from the /api/v2/assets endpoint and returns it as a DataFrame.
+    Handles pagination and filters for 'survey' type assets if specified; pages after the first are fetched
+    concurrently by _iter_list_pages.
     """
-    headers = {"Authorization": f"Token {token}", "Accept": "application/json"}
-    all_assets = []
+    raw_assets = []
     total_assets_count = None
+    last_ui = 0.0
     pb = progress_bar if progress_bar is not None else st.progress(0)
     st_text = status_text if status_text is not None else st.empty()
 
-    next_url = f"{server_url}/api/v2/assets/?format=json"
-    while next_url:
-        try:
-            res = requests.get(next_url, headers=headers, timeout=15)
-            res.raise_for_status()
-            data = res.json()
-
+    assets_url = f"{server_url}/api/v2/assets/?format=json"
+    if include_surveys:
+        assets_url += SURVEY_ONLY_QUERY
+    try:
+        for data in _iter_list_pages(assets_url, token, timeout=15):
             if total_assets_count is None:
                 total_assets_count = data.get("count", 0)
                 if total_assets_count == 0:
                     st_text.text("No assets found.")
                     pb.empty()
-                    return []
+                    return pd.DataFrame(columns=ASSET_COLUMNS)
 
             for asset in data.get("results", []):
                 if not isinstance(asset, dict):
@@ -179,174 +398,198 @@ def fetch_all_assets_metadata(token, server_url, include_surveys=True, progress_
                 if include_surveys and asset.get("asset_type") != "survey":
                     continue
 
-                settings = asset.get("settings", {})
-                country_list = settings.get("country", [])
-                sector_data = settings.get("sector")
-
-                country_label = country_list[0].get("label", "") if country_list else ""
-                country_code = country_list[0].get("value", "") if country_list else ""
-
-                status_label = "Deployed" if asset.get("deployment_status") == "deployed" else "Archived" if asset.get("is_archived") else "Draft"
-
-                all_assets.append({
-                    "Name": asset.get("name"),
-                    "UID": asset.get("uid"),
-                    "Submission Count": asset.get("deployment__submission_count", 0),
-                    "Date Created": asset.get("date_created"),
-                    "Date Modified": asset.get("date_modified"),
-                    "Country Label": country_label,
-                    "Country Code": country_code,
-                    "Source View UID": "N/A",
-                    "Source View Name": "Direct Assets API",
-                    "Is Deployed": asset.get("is_deployed", False),
-                    "Is Archived": asset.get("is_archived", False),
-                    "Status": status_label,
-                    "Owner Username": asset.get("owner__username"),
-                    "Sector": sector_data,
-                    "Operational Purpose": (settings.get("operational_purpose") or {}).get("label"),
-                    "Collects PII": (settings.get("collects_pii") or {}).get("label"),
-                    "Description": settings.get("description", "")
-                })
-
-            current_progress = len(all_assets) / total_assets_count if total_assets_count > 0 else 0
-            st_text.text(f"Fetching assets: {len(all_assets)} of {total_assets_count}")
-            pb.progress(current_progress)
-
-            next_url = data.get("next")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to fetch assets from /api/v2/assets/: {e}")
-            pb.empty()
-            st_text.empty()
-            return []
+                raw_assets.append(asset)
+
+            if progress_due(last_ui, final=not data.get("next")):
+                current_progress = min(1.0, len(raw_assets) / total_assets_count) if total_assets_count > 0 else 0
+                st_text.text(f"Fetching assets: {len(raw_assets)} of {total_assets_count}")
+                pb.progress(current_progress)
+                last_ui = time.monotonic()
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        st.error(f"Failed to fetch assets from /api/v2/assets/: {e}")
+        pb.empty()
+        st_text.empty()
+        return pd.DataFrame(columns=ASSET_COLUMNS)
     
-    return all_assets
+    return _build_assets_frame(raw_assets, "N/A", "Direct Assets API")
+
+def _add_element_terms(element, add):
+    """
+    Passes a survey element's name, label(s) and type to add().
+    Exact type() checks let values that already are strings skip the str() call; this runs once per element of every form.
+    """
+    # Add 'name'
+    name = element.get("name")
+    if name is not None:
+        add(name if type(name) is str else str(name))
+
+    # Add all items from 'label' list
+    labels = element.get("label")
+    if type(labels) is list:
+        for label_text in labels:
+            if label_text is not None:
+                add(label_text if type(label_text) is str else str(label_text))
+    elif type(labels) is str: # Handle single string label
+        add(labels)
+
+    # Add 'type'
+    element_type = element.get("type")
+    if element_type is not None:
+        add(element_type if type(element_type) is str else str(element_type))
+
+
+def _parse_form_terms(uid, token, server_url):
+    """
+    Fetches one asset's full JSON detail and extracts its question names, labels and types.
+    Returns (sorted_terms, content_issue), where content_issue describes why no survey could be parsed (or is None).
+    """
+    column_terms = set()
+    full_asset_json_url = f"{server_url}/api/v2/assets/{uid}/?format=json"
+
+    res = get_session(token).get(full_asset_json_url, timeout=20) # Increased timeout for full content
+    res.raise_for_status()
+    full_asset_data = _loads(res.content)
+
+    form_content = full_asset_data.get("content")
+    if not (isinstance(form_content, dict) and "survey" in form_content):
+        return [], "does not have valid 'content' data"
+
+    survey_elements = form_content.get("survey", [])
+    if not isinstance(survey_elements, list):
+        return [], "has 'content' but its 'survey' field is not a list"
 
-def fetch_and_parse_form_definitions(projects_df, token, server_url):
+    add = column_terms.add # Bound once instead of per term
+    for element in survey_elements:
+        if type(element) is dict:
+            _add_element_terms(element, add)
+
+    return sorted(filter(None, column_terms)), None
+
+
+@st.cache_data(persist="disk", show_spinner=False, max_entries=1000)
+def _fetch_form_terms(uid, token, server_url, date_modified):
+    """
+    Disk-persisted wrapper around _parse_form_terms; date_modified is part of the cache key so an edited form is fetched again.
+    Request and decoding errors propagate, so failures are never cached.
+    """
+    return _parse_form_terms(uid, token, server_url)
+
+
+def _fetch_and_parse_one(uid, form_name, date_modified, token, server_url):
+    """
+    Gets one form's terms through the disk cache, or directly when date_modified is missing and cannot key it.
+    Runs inside a worker thread, so problems are returned as (level, message) pairs rather than shown directly.
+    Terms come back already de-duplicated and sorted, leaving the main thread only a set union per form.
+    """
+    columns = []
+    messages = []
+
+    try:
+        if pd.isna(date_modified):
+            columns, content_issue = _parse_form_terms(uid, token, server_url)
+        else:
+            columns, content_issue = _fetch_form_terms(uid, token, server_url, str(date_modified))
+        if content_issue:
+            messages.append(("warning", f"Form '{form_name}' (UID: {uid}) {content_issue}. Could not parse form definition from JSON."))
+    except requests.exceptions.RequestException as e:
+        messages.append(("error", f"Failed to fetch full JSON form definition for {form_name} (UID: {uid}): {e}. No form definition terms extracted."))
+    except json.JSONDecodeError as e:
+        messages.append(("error", f"Failed to decode JSON for {form_name} (UID: {uid}): {e}. The response may not be valid JSON. No form definition terms extracted."))
+    except Exception as e:
+        messages.append(("error", f"An unexpected error occurred during form definition fetch for {form_name} (UID: {uid}): {e}. No form definition terms extracted."))
+
+    return form_name, uid, columns, messages
+
+
+def fetch_and_parse_form_definitions(projects, token, server_url):
     """
-    Fetches and parses form definitions (names, labels, types) for a given DataFrame of projects (assets).
-    Always makes a dedicated API call to the asset's full JSON detail endpoint for accuracy.
+    Fetches and parses form definitions (names, labels, types) for a tuple of (UID, Name, Date Modified) project triples.
+    Always makes a dedicated API call to the asset's full JSON detail endpoint for accuracy, unless the
+    unchanged form is already in the on-disk cache.
+    Requests are issued concurrently; only the main thread updates Streamlit elements.
+    Not cached as a whole: successful forms are cached individually on disk, so forms that failed are retried on the next call.
     """
-    headers = {"Authorization": f"Token {token}", "Accept": "application/json"} # Ensure Accept JSON
-    form_details = [] 
     all_unique_columns = set()
 
-    if projects_df.empty:
+    if not projects:
         st.info("No projects in the filtered list to analyze for form definitions.")
         return [], set()
 
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for i, (_, row) in enumerate(projects_df.iterrows()):
-        uid = row["UID"]
-        form_name = row["Name"]
-        
-        column_terms = set() 
-        
-        # --- NEW PRIMARY LOGIC: Always fetch the full JSON asset detail ---
-        full_asset_json_url = f"{server_url}/api/v2/assets/{uid}/?format=json"
-        
-        status_text.text(f"Fetching and parsing form content for: {form_name} ({i+1}/{len(projects_df)})...")
-        try:
-            res = requests.get(full_asset_json_url, headers=headers, timeout=20) # Increased timeout for full content
-            res.raise_for_status()
-            full_asset_data = res.json()
-
-            form_content = full_asset_data.get("content")
-            if isinstance(form_content, dict) and "survey" in form_content:
-                survey_elements = form_content.get("survey", [])
-                if isinstance(survey_elements, list):
-                    for element in survey_elements:
-                        if isinstance(element, dict):
-                            # Add 'name'
-                            if "name" in element and element["name"] is not None:
-                                column_terms.add(str(element["name"]))
-                            
-                            # Add all items from 'label' list
-                            labels = element.get("label")
-                            if isinstance(labels, list):
-                                for label_text in labels:
-                                    if label_text is not None:
-                                        column_terms.add(str(label_text))
-                            elif isinstance(labels, str) and labels is not None: # Handle single string label
-                                column_terms.add(str(labels))
-                            
-                            # Add 'type'
-                            if "type" in element and element["type"] is not None:
-                                column_terms.add(str(element["type"]))
-                else:
-                    st.warning(f"Form '{form_name}' (UID: {uid}) has 'content' but its 'survey' field is not a list. Could not parse form definition from JSON.")
-            else:
-                st.warning(f"Form '{form_name}' (UID: {uid}) does not have valid 'content' data. Could not parse form definition from JSON.")
-
-        except requests.exceptions.RequestException as e:
-            st.error(f"Failed to fetch full JSON form definition for {form_name} (UID: {uid}): {e}. No form definition terms extracted.") 
-        except json.JSONDecodeError as e:
-            st.error(f"Failed to decode JSON for {form_name} (UID: {uid}): {e}. The response may not be valid JSON. No form definition terms extracted.")
-        except Exception as e:
-            st.error(f"An unexpected error occurred during form definition fetch for {form_name} (UID: {uid}): {e}. No form definition terms extracted.")
-            
-        unique_form_columns = sorted(list(filter(None, column_terms)))
-        all_unique_columns.update(unique_form_columns)
-
-        form_details.append({ 
-            "Form Name": form_name,
-            "UID": uid,
-            "Columns": unique_form_columns
-        })
-        progress_bar.progress((i + 1) / len(projects_df)) 
+    total = len(projects)
+    form_details = [None] * total # Filled by position so output order follows the project list
+    done = 0
+    last_ui = 0.0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futures = {
+            ex.submit(_fetch_and_parse_one, uid, form_name, date_modified, token, server_url): i
+            for i, (uid, form_name, date_modified) in enumerate(projects)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            form_name, uid, unique_form_columns, messages = future.result()
+            for level, message in messages:
+                getattr(st, level)(message)
+            all_unique_columns.update(unique_form_columns)
+
+            form_details[futures[future]] = {
+                "Form Name": form_name,
+                "UID": uid,
+                "Columns": unique_form_columns
+            }
+            done += 1
+            if progress_due(last_ui, final=done == total):
+                status_text.text(f"Fetched and parsed form content for: {form_name} ({done}/{total})...")
+                progress_bar.progress(done / total)
+                last_ui = time.monotonic()
             
     progress_bar.empty()
     status_text.empty()
     return form_details, all_unique_columns 
 
 
-@st.cache_data(show_spinner="Fetching and processing submission data...")
-def fetch_submissions_data_from_v2_json(uid, token, server_url):
+@st.cache_data(show_spinner=False, max_entries=8, ttl=1800)
+def fetch_submissions_frame(uid, token, server_url, max_workers=MAX_WORKERS):
     """
-    Fetches raw submission data in JSON format from /api/v2/assets/{asset_uid}/data/
-    and converts it to a pandas DataFrame. Handles pagination.
+    Fetches all submissions of one asset from /api/v2/assets/{asset_uid}/data/ as a flattened DataFrame
+    (empty when there are none). Never touches Streamlit, so it can run in worker threads; errors propagate
+    and are therefore never cached. Only the 8 most recently fetched forms stay cached, for 30 minutes.
+    After the first page reveals the total count, the remaining pages are fetched with up to max_workers threads;
+    callers that already run forms in a thread pool pass max_workers=1 so the pools do not multiply.
+    Pages are capped at SUBMISSIONS_PAGE_SIZE rows; each is flattened as it arrives, its raw JSON is released,
+    and the pages are concatenated once at the end.
     """
-    headers = {"Authorization": f"Token {token}", "Accept": "application/json"}
-    all_submissions = []
-    next_url = f"{server_url}/api/v2/assets/{uid}/data/?format=json"
-    
-    try:
-        total_submissions_count = None
-
-        while next_url: # Loop to handle pagination
-            res = requests.get(next_url, headers=headers, timeout=180) # Increased timeout significantly for data
-            res.raise_for_status()
+    session = get_session(token)
+    page_dfs = []
 
-            data = res.json()
-            submissions_page = data.get("results", [])
-            
-            if total_submissions_count is None: # Get total count from the first page
-                total_submissions_count = data.get("count", 0)
-                if total_submissions_count == 0:
-                    st.warning(f"No submissions found for UID {uid}.")
-                    return pd.DataFrame()
+    # Increased timeout significantly for data
+    data = _fetch_json(session, f"{server_url}/api/v2/assets/{uid}/data/?format=json&limit={SUBMISSIONS_PAGE_SIZE}", timeout=180)
 
-            all_submissions.extend(submissions_page) # Accumulate submissions
-            
-            next_url = data.get("next") # Get the URL for the next page
-            
-        if not all_submissions:
-            st.warning(f"No submissions found for UID {uid} after pagination.")
-            return pd.DataFrame() # Return empty DataFrame
+    total_submissions_count = data.get("count", 0) # Get total count from the first page
+    if total_submissions_count == 0:
+        return pd.DataFrame()
 
-        # If data is present, convert to DataFrame
-        df = pd.json_normalize(all_submissions)
-        return df
+    page_dfs.append(pd.json_normalize(data.get("results", [])))
 
-    except requests.exceptions.RequestException as e:
-        st.error(f"Failed to fetch JSON submissions for UID {uid} from '{server_url}/api/v2/assets/{uid}/data/': {e}")
-        st.info("💡 **Tip:** Check if the form is deployed, has submissions, or if your API token is correct for this project/server.")
-        st.warning("⚠️ **Important Note:** The `/api/v2/assets/{asset_uid}/data/` endpoint provides raw JSON. For large, complex, or deeply nested forms (especially those with repeat groups), its flattened output might differ significantly from Kobo's native Excel exports. Consider using Kobo's asynchronous `/exports` API for a true UI-like Excel export if this is a limitation.")
-        return None
-    except json.JSONDecodeError as e:
-        st.error(f"Failed to decode JSON from submissions for UID {uid}: {e}. The response may not be valid JSON.")
-        return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred during JSON submission fetch for UID {uid}: {e}")
-        return None
+    next_url = data.get("next") # Get the URL for the next page
+    page_urls = _remaining_page_urls(next_url, total_submissions_count) if next_url else []
+    if page_urls is None:
+        while next_url: # Unrecognised paging scheme: follow 'next' links one by one
+            data = _fetch_json(session, next_url, timeout=180)
+            page_dfs.append(pd.json_normalize(data.get("results", [])))
+            next_url = data.get("next")
+    elif max_workers <= 1:
+        page_dfs.extend(_fetch_submissions_page(session, url) for url in page_urls)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+            # map() yields pages in request order, keeping submissions in server order
+            page_dfs.extend(ex.map(lambda url: _fetch_submissions_page(session, url), page_urls))
+
+    page_dfs = [page_df for page_df in page_dfs if not page_df.empty]
+    if not page_dfs:
+        return pd.DataFrame()
+
+    # If data is present, stitch the per-page frames together
+    return pd.concat(page_dfs, ignore_index=True)
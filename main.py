@@ -1,17 +1,34 @@
 # Required packages:
-# pip install streamlit requests pandas openpyxl altair lxml fuzzywuzzy # Added fuzzywuzzy
+# pip install streamlit requests pandas xlsxwriter lxml rapidfuzz
 # lxml is often faster for XML, but ElementTree is built-in
-# fuzzywuzzy is for string comparison, often needs python-Levenshtein for speed
+# rapidfuzz is for string comparison (compiled, API-compatible replacement for fuzzywuzzy)
 
 import streamlit as st
 import requests
 import pandas as pd
+import numpy as np
+import pyarrow as pa # Installed with Streamlit
 import io
 import zipfile
 from datetime import datetime
-import altair as alt
 import re # For regular expressions in keyword search
-from fuzzywuzzy import fuzz # Keep this import here for fuzz.ratio
+import uuid
+import functools
+import hashlib
+import os
+import time
+import concurrent.futures
+from rapidfuzz import fuzz, process, utils # fuzz scorers; process.cdist scores all keyword/term pairs at once
+
+try:
+    import ahocorasick # Optional: pip install pyahocorasick for faster searches with many keywords
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson # Optional: pip install orjson for faster JSON submission exports
+except ImportError:
+    orjson = None
 
 # Import API functions from the new file
 import kobo_api_functions as kobo_api
@@ -19,41 +36,495 @@ import kobo_api_functions as kobo_api
 st.set_page_config(layout="wide", page_title="KoboToolbox Project Dashboard")
 st.title("KoboToolbox Project Dashboard")
 
+# --- Helper Functions ---
+PANDAS_ISO8601_FORMAT = int(pd.__version__.split(".")[0]) >= 2 # pd.to_datetime(format="ISO8601") was added in pandas 2.0
+
+# This function converts raw sector data (dict or str) into a consistent string for filtering and display
+def get_sector_display_name(sector_item):
+    if isinstance(sector_item, dict) and sector_item: # Check if it's a non-empty dictionary
+        return sector_item.get('name') or sector_item.get('label') or str(sector_item)
+    elif isinstance(sector_item, str) and sector_item.strip(): # If it's a non-empty string
+        return sector_item
+    return None # Handle None, empty strings, or other unexpected types
+
+
+def parse_kobo_dates(assets_df):
+    """
+    Parses the 'Date Created' and 'Date Modified' columns in place into timezone-naive UTC timestamps.
+    Kobo sends ISO-8601 strings, so the ISO fast path is used instead of per-value format inference.
+    format="ISO8601" only exists in pandas>=2; older versions fall back to the default parser.
+    """
+    format_kwargs = {"format": "ISO8601"} if PANDAS_ISO8601_FORMAT else {}
+    for col in ["Date Created", "Date Modified"]:
+        assets_df[col] = pd.to_datetime(assets_df[col], errors="coerce", utc=True, **format_kwargs).dt.tz_convert(None)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_keyword_pattern(keywords):
+    """
+    Compiles a case-insensitive regex matching ANY of the given keywords (a tuple), or returns None if there are none.
+    Cached so a keyword tuple is escaped, joined and compiled only once.
+    """
+    pattern = "|".join(re.escape(word) for word in keywords if word)
+    return re.compile(pattern, re.IGNORECASE) if pattern else None
+
+
+# Above this many keywords, an Aho-Corasick automaton (if installed) beats a regex alternation
+AHOCORASICK_MIN_KEYWORDS = 20
+
+
+@functools.lru_cache(maxsize=32)
+def build_keyword_automaton(keywords):
+    """
+    Builds an Aho-Corasick automaton over the lower-cased keywords (a tuple), which scans each string once
+    regardless of how many keywords there are. Cached per keyword tuple.
+    """
+    automaton = ahocorasick.Automaton()
+    for word in keywords:
+        if word:
+            automaton.add_word(word.lower(), word)
+    automaton.make_automaton()
+    return automaton
+
+
+def keyword_match_mask(values, keywords):
+    """
+    Returns a boolean NumPy array telling which values contain ANY of the keywords (a tuple), case-insensitively.
+    Non-string values never match. Uses pyahocorasick for long keyword lists when it is installed, a regex otherwise.
+    """
+    if ahocorasick is not None and len(keywords) > AHOCORASICK_MIN_KEYWORDS:
+        automaton = build_keyword_automaton(keywords)
+        return np.fromiter(
+            (isinstance(value, str) and next(automaton.iter(value.lower()), None) is not None for value in values),
+            dtype=bool,
+            count=len(values)
+        )
+    pattern = compile_keyword_pattern(keywords)
+    if pattern is None:
+        return np.ones(len(values), dtype=bool)
+    return values.str.contains(pattern, na=False).to_numpy()
+
+
+# Lets the quantitative axes pan and zoom, as Altair's .interactive() did
+INTERACTIVE_CHART_PARAMS = [{"name": "grid", "select": "interval", "bind": "scales"}]
+
+
+def bar_chart_spec(category, value, category_title, value_title, title, horizontal=True):
+    """
+    Builds a Vega-Lite bar chart spec as a plain dict for st.vega_lite_chart, skipping Altair's per-rerun schema validation.
+    Horizontal bars list the categories on the y axis, largest first; vertical bars keep the data order (e.g. months).
+    """
+    value_encoding = {"field": value, "type": "quantitative", "title": value_title}
+    if horizontal:
+        category_encoding = {"field": category, "type": "nominal", "sort": "-x", "title": category_title}
+        encoding = {"y": category_encoding, "x": value_encoding}
+    else:
+        category_encoding = {"field": category, "type": "ordinal", "sort": None, "title": category_title}
+        encoding = {"x": category_encoding, "y": value_encoding}
+    encoding["tooltip"] = [
+        {"field": category, "type": category_encoding["type"]},
+        {"field": value, "type": "quantitative"}
+    ]
+    return {"mark": "bar", "encoding": encoding, "title": title, "params": INTERACTIVE_CHART_PARAMS}
+
+
+# Form Analyser method names mapped to the rapidfuzz scorers handed to process.cdist
+FUZZY_SCORERS = {
+    "Simple Ratio (fuzz.ratio)": fuzz.ratio,
+    "Partial Ratio (fuzz.partial_ratio)": fuzz.partial_ratio,
+    "Token Sort Ratio (fuzz.token_sort_ratio)": fuzz.token_sort_ratio,
+    "Token Set Ratio (fuzz.token_set_ratio)": fuzz.token_set_ratio,
+    "Weighted Ratio (fuzz.WRatio)": fuzz.WRatio,
+}
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def best_term_scores(_normalized_terms, analysis_id, normalized_keywords, scorer_name):
+    """
+    Scores every normalized term against the normalized keywords (a tuple) with the FUZZY_SCORERS scorer of that name,
+    returning each term's best score as a float64 array. No threshold is applied, so searches that only change the
+    threshold reuse the cached scores. The term list is not hashed; analysis_id identifies it.
+    """
+    scorer = FUZZY_SCORERS[scorer_name]
+    best_scores = np.zeros(len(_normalized_terms), dtype=np.float64)
+    exact_keywords = tuple(kw for kw in normalized_keywords if kw)
+    if _normalized_terms and scorer is fuzz.partial_ratio and exact_keywords:
+        # A keyword contained in a term always scores 100 with partial_ratio, so literal
+        # substring hits are settled by one cheap scan and skip the fuzzy scorer
+        best_scores[keyword_match_mask(pd.Series(_normalized_terms, dtype=object), exact_keywords)] = 100
+    terms_to_score = np.flatnonzero(best_scores < 100)
+    if terms_to_score.size:
+        # Score the remaining distinct terms against every keyword in one vectorized call (terms x keywords matrix)
+        scores = process.cdist(
+            [_normalized_terms[term_id] for term_id in terms_to_score],
+            list(normalized_keywords),
+            scorer=scorer,
+            processor=None, # Both sides are already normalized
+            dtype=np.float64,
+            workers=-1
+        )
+        best_scores[terms_to_score] = scores.max(axis=1)
+    return best_scores
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def apply_project_filters(_assets_df, assets_load_id, date_start, date_end, project_name_keywords, selected_countries,
+                          selected_statuses, selected_sectors, selected_operational_purposes, selected_collects_pii,
+                          description_keywords, min_submission_count):
+    """
+    Applies the sidebar filters to the loaded assets and returns the filtered DataFrame.
+    Memoized on the filter values: the DataFrame itself is not hashed (leading underscore) and is identified by
+    assets_load_id, which changes on every load, so repeating a filter state skips the filtering entirely.
+    List arguments must be passed as tuples.
+    """
+    if _assets_df.empty:
+        return _assets_df.copy()
+
+    # Every filter ANDs into one boolean mask; the frame is sliced (and copied) only once at the end
+    mask = np.ones(len(_assets_df), dtype=bool)
+
+    # Filter 1: Date Range
+    if "Date Created" in _assets_df.columns:
+        # Compare timestamps against Timestamp bounds rather than converting every row to a Python date
+        created = _assets_df["Date Created"]
+        range_start = pd.Timestamp(date_start)
+        range_end = pd.Timestamp(date_end) + pd.Timedelta(days=1) # Exclusive, so the whole end day is included
+        mask &= ((created >= range_start) & (created < range_end)).to_numpy()
+
+    # Filter 2: Project Name Keyword Search (using single text input)
+    if project_name_keywords:
+        if "Name" in _assets_df.columns:
+            mask &= keyword_match_mask(_assets_df["Name"], project_name_keywords)
+        else:
+            st.warning("Project Name column not found for keyword search.")
+            
+    # Filter 3: Country Label
+    if selected_countries: # Only filter if selections are made
+        if "Country Label" in _assets_df.columns:
+            mask &= _assets_df["Country Label"].isin(selected_countries).to_numpy()
+        else:
+            st.warning("Country Label column not found for country filter.")
+
+    # Filter 4: Project Status (Re-added logic, using selected_statuses)
+    if selected_statuses:
+        if "Status" in _assets_df.columns:
+            mask &= _assets_df["Status"].isin(selected_statuses).to_numpy()
+        else:
+            st.warning("Status column not found for project status filter.")
+    elif "Status" in _assets_df.columns: # If user explicitly selects no statuses, filter out everything based on status
+        mask[:] = False
+
+    # Filter: Operational Purpose
+    if "Operational Purpose" in _assets_df.columns and selected_operational_purposes:
+        mask &= _assets_df["Operational Purpose"].isin(selected_operational_purposes).to_numpy()
+
+    # Filter: Collects PII
+    if "Collects PII" in _assets_df.columns and selected_collects_pii:
+        mask &= _assets_df["Collects PII"].isin(selected_collects_pii).to_numpy()
+
+    # Filter: Description
+    if "Description" in _assets_df.columns and description_keywords:
+        mask &= keyword_match_mask(_assets_df["Description"], description_keywords)
+
+    # Filter 5: Sector (NEW Logic)
+    if selected_sectors:
+        if "Sector_Display" in _assets_df.columns:
+            # Sector_Display holds get_sector_display_name() of each Sector, precomputed at load time
+            mask &= _assets_df["Sector_Display"].isin(selected_sectors).to_numpy()
+        else:
+            st.warning("Sector column not found for sector filter.")
+    
+    # Filter 6: Minimum Submission Count
+    if "Submission Count" in _assets_df.columns:
+        mask &= (_assets_df["Submission Count"] >= min_submission_count).to_numpy()
+    else:
+        st.warning("Submission Count column not found for minimum submissions filter.")
+
+    return _assets_df[mask]
+
+
+def top_n_rows(projects_df, column, n):
+    """
+    Returns the rows with the n largest values of a column, in no particular order.
+    Only that column is partitioned (np.argpartition, O(N)); the frame is sliced for the n selected rows alone.
+    """
+    if n >= len(projects_df):
+        return projects_df
+    top_positions = np.argpartition(-projects_df[column].to_numpy(), n - 1)[:n]
+    return projects_df.iloc[top_positions]
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def count_projects_by(_projects_df, projects_key, column):
+    """
+    Counts projects per value of a column, largest first, as a (value, "Project Count") DataFrame.
+    The DataFrame is not hashed; projects_key identifies it. observed=True skips categories without projects.
+    """
+    return (
+        _projects_df.groupby(column, observed=True).size()
+        .sort_values(ascending=False, kind="stable")
+        .reset_index(name="Project Count")
+    )
+
+
+# Bar charts show at most this many categories; the rest are summed into an "Other" bar
+MAX_CHART_CATEGORIES = 30
+
+
+def fold_small_categories(counts_df, n=MAX_CHART_CATEGORIES, other_label="Other"):
+    """
+    Keeps the first n rows of a count_projects_by result (the largest counts) and sums the rest into one
+    other_label row, so a long tail of categories is not shipped to the browser bar by bar.
+    """
+    if len(counts_df) <= n:
+        return counts_df
+    other_row = pd.DataFrame({
+        counts_df.columns[0]: [other_label],
+        "Project Count": [counts_df["Project Count"].iloc[n:].sum()]
+    })
+    return pd.concat([counts_df.iloc[:n].astype({counts_df.columns[0]: object}), other_row], ignore_index=True)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def count_projects_by_month(_projects_df, projects_key, column):
+    """
+    Counts projects per calendar month of a date column as a ("Month", "Project Count") DataFrame,
+    with months formatted as YYYY-MM. Like count_projects_by, the DataFrame is identified by projects_key.
+    Months are counted as periods, then reindexed over the full range so months without projects show as 0.
+    """
+    months = _projects_df[column].dropna().dt.to_period("M")
+    if months.empty:
+        return pd.DataFrame({"Month": pd.Series(dtype=object), "Project Count": pd.Series(dtype="int64")})
+    month_range = pd.period_range(months.min(), months.max(), freq="M")
+    monthly_counts = months.value_counts().reindex(month_range, fill_value=0)
+    return pd.DataFrame({"Month": month_range.strftime("%Y-%m"), "Project Count": monthly_counts.to_numpy()})
+
+
+# Columns shown in the Project Browser table, in order; 'Sector' is filled from Sector_Display
+DISPLAY_COLUMNS = [
+    "Name", "UID", "Status", "Submission Count", 
+    "Date Created", "Date Modified", "Country Label", "Sector", 
+    "Source View Name", "Owner Username"
+]
+
+
+def build_display_table(assets_df):
+    """
+    Converts the Project Browser columns of a freshly loaded asset table to Arrow once, so reruns can hand
+    st.dataframe a row subset of it instead of converting the pandas frame again on every render.
+    """
+    display_columns = {}
+    for col in DISPLAY_COLUMNS:
+        source_col = "Sector_Display" if col == "Sector" else col
+        if source_col in assets_df.columns:
+            display_columns[col] = assets_df[source_col]
+    return pa.Table.from_pandas(pd.DataFrame(display_columns), preserve_index=False)
+
+
+# Low-cardinality text columns stored as pandas categoricals once assets are loaded
+CATEGORICAL_ASSET_COLUMNS = [
+    "Country Label", "Status", "Operational Purpose", "Collects PII", "Owner Username", "Source View Name", "Sector_Display"
+]
+
+def sorted_options(column):
+    """
+    Returns the sorted distinct non-null values of a column; categoricals are read straight from their categories.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return sorted(column.cat.categories.tolist())
+    return sorted(column.dropna().unique().tolist())
+
+
+def build_filter_options(assets_df):
+    """
+    Computes the sidebar filter choices and bounds for a freshly loaded asset table.
+    Called once per load so widget reruns only read the stored result.
+    Options for an optional column are None when the column is missing.
+    """
+    valid_dates = assets_df["Date Created"].dropna()
+    return {
+        "country": sorted_options(assets_df["Country Label"]) if not assets_df.empty else [],
+        "status": sorted_options(assets_df["Status"]) if "Status" in assets_df.columns and not assets_df.empty else [],
+        "sector": sorted_options(assets_df["Sector_Display"]) if "Sector_Display" in assets_df.columns else [],
+        "operational_purpose": sorted_options(assets_df["Operational Purpose"]) if "Operational Purpose" in assets_df.columns else None,
+        "collects_pii": assets_df["Collects PII"].dropna().unique().tolist() if "Collects PII" in assets_df.columns else None, # First-seen order
+        "date_min": valid_dates.min().date() if not valid_dates.empty else datetime.now().date(),
+        "date_max": valid_dates.max().date() if not valid_dates.empty else datetime.now().date(),
+        "max_submissions": int(assets_df["Submission Count"].max() if "Submission Count" in assets_df.columns and not assets_df.empty else 0)
+    }
+
+
+# Loaded assets can also be kept on disk (in the user's cache directory, not the app's), so a page refresh does not re-fetch them
+ASSET_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "kobo-explore")
+ASSET_CACHE_TTL = 60 * 60 # Seconds before a cached asset list is considered stale
+
+
+def asset_cache_prefix(server_url, token):
+    """
+    Returns the file name prefix shared by every cached asset list of a server and token; only a hash of them appears in it.
+    """
+    return "assets_" + hashlib.sha256(f"{server_url}\n{token}".encode()).hexdigest()[:32]
+
+
+def asset_cache_path(server_url, token, data_source, include_surveys, view_uids=()):
+    """
+    Returns the Parquet cache file for a server and token and the settings that produced the assets:
+    the data source, the surveys-only option and the selected project views (in any order).
+    """
+    settings = f"{data_source}\n{bool(include_surveys)}\n{','.join(sorted(view_uids))}"
+    settings_key = hashlib.sha256(settings.encode()).hexdigest()[:16]
+    return os.path.join(ASSET_CACHE_DIR, f"{asset_cache_prefix(server_url, token)}_{settings_key}.parquet")
+
+
+def clear_assets_cache(server_url, token):
+    """
+    Deletes every cached asset list of a server and token.
+    """
+    prefix = asset_cache_prefix(server_url, token)
+    if os.path.isdir(ASSET_CACHE_DIR):
+        for file_name in os.listdir(ASSET_CACHE_DIR):
+            if file_name.startswith(prefix):
+                os.remove(os.path.join(ASSET_CACHE_DIR, file_name))
+
+
+def save_assets_cache(assets_df, path):
+    """
+    Writes the loaded assets to a local Parquet cache file.
+    'Sector' holds raw dicts that Parquet cannot store, so it is saved as its display name.
+    """
+    try:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        cache_df = assets_df.assign(Sector=assets_df["Sector_Display"])
+        cache_df.to_parquet(path, compression="snappy", index=False)
+    except Exception as e:
+        st.warning(f"Could not write the local asset cache: {e}")
+
+
+def load_assets_cache(path):
+    """
+    Reads cached assets from a Parquet cache file, or returns None if the file is missing or stale.
+    """
+    try:
+        if time.time() - os.path.getmtime(path) > ASSET_CACHE_TTL:
+            return None
+        return pd.read_parquet(path, engine="pyarrow")
+    except Exception: # Missing, unreadable or written by an incompatible version; fall back to fetching
+        return None
+
+
+def store_loaded_assets(assets_df, cache_path=None):
+    """
+    Prepares a fetched (or restored) asset frame and makes it the app's current asset set: one row per UID,
+    parsed dates, Sector_Display, categorical columns, filter options, the Arrow display table and a new load id.
+    The prepared assets are written to cache_path when one is given.
+    Returns the prepared DataFrame.
+    """
+    st.session_state.loaded_assets_from_views = assets_df
+    assets_df = assets_df.drop_duplicates(subset=['UID']).copy() # Own copy; the fetched frame stays in session state
+    parse_kobo_dates(assets_df)
+    assets_df["Sector_Display"] = assets_df["Sector"].map(get_sector_display_name) # Normalized once here for filtering and display
+    assets_df = assets_df.astype({col: "category" for col in CATEGORICAL_ASSET_COLUMNS}) # Repeated strings stored once; isin() compares codes
+
+    st.session_state.all_loaded_assets_df = assets_df
+    st.session_state.filter_options = build_filter_options(assets_df)
+    st.session_state.all_loaded_assets_arrow = build_display_table(assets_df)
+    st.session_state.assets_load_id = uuid.uuid4().hex
+    if cache_path:
+        save_assets_cache(assets_df, cache_path)
+    st.session_state.filtered_projects_df = assets_df # Initially all loaded (both only ever get replaced, never modified in place)
+    st.session_state.assets_loaded = True
+    st.session_state.filters_applied = True # Indicate filters can be applied now
+    return assets_df
+
+
+def submissions_to_json(submissions_df):
+    """
+    Serializes submissions as an indented JSON array of records (bytes with orjson, str otherwise).
+    orjson writes NaN as null and falls back to str() for values it cannot encode natively, such as Timestamps.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            submissions_df.to_dict(orient="records"),
+            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC,
+            default=str
+        )
+    return submissions_df.to_json(orient="records", indent=4)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_metadata_excel(_projects_df, projects_key):
+    """
+    Serializes the projects' metadata to .xlsx bytes with every column, 'Sector' taken from Sector_Display.
+    Cached like count_projects_by: the DataFrame is not hashed, projects_key identifies it, so reruns that
+    do not change the filtered projects reuse the workbook instead of writing it again.
+    """
+    # 'Sector' holds raw dicts/strings; export the display names computed at load time instead of the helper column
+    export_df = _projects_df.assign(Sector=_projects_df["Sector_Display"]).drop(columns=["Sector_Display"])
+
+    # Convert datetime columns to timezone-naive for Excel compatibility
+    for col in ["Date Created", "Date Modified"]:
+        if pd.api.types.is_datetime64_any_dtype(export_df[col]) and export_df[col].dt.tz is not None:
+            export_df[col] = export_df[col].dt.tz_localize(None)
+
+    # XlsxWriter streams the sheet out much faster than openpyxl. constant_memory is left off:
+    # pandas writes cells column by column, and that mode only keeps the current row.
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as excel_writer:
+        export_df.to_excel(excel_writer, index=False)
+    return excel_buffer.getvalue()
+
+
+# Replaces characters that are not allowed in file names with "_" in one str.translate pass
+FILENAME_TRANSLATION = str.maketrans({c: "_" for c in '/\\:*?"<>|'})
+
+
 # --- Session State Initialization ---
 if "available_project_views" not in st.session_state: # Stores metadata of all project views (for PV API)
     st.session_state.available_project_views = []
 if "project_views_fetched" not in st.session_state:
     st.session_state.project_views_fetched = False
-if "loaded_assets_from_views" not in st.session_state: # Stores the actual asset data loaded (list of dicts)
-    st.session_state.loaded_assets_from_views = []
+if "loaded_assets_from_views" not in st.session_state: # Stores the actual asset data loaded (DataFrame)
+    st.session_state.loaded_assets_from_views = pd.DataFrame()
 if "assets_loaded" not in st.session_state: # Flag when assets from views are loaded
     st.session_state.assets_loaded = False
 if "filtered_projects_df" not in st.session_state: # The DataFrame currently displayed/filtered
     st.session_state.filtered_projects_df = pd.DataFrame()
 if "filters_applied" not in st.session_state:
     st.session_state.filters_applied = False
+if "filtered_projects_key" not in st.session_state: # Load id plus filter values behind filtered_projects_df
+    st.session_state.filtered_projects_key = None
 # New session state variable to hold all loaded assets as a DataFrame for filter options
 if "all_loaded_assets_df" not in st.session_state:
     st.session_state.all_loaded_assets_df = pd.DataFrame()
+if "all_loaded_assets_arrow" not in st.session_state: # Project Browser columns of all_loaded_assets_df as an Arrow table, row for row
+    st.session_state.all_loaded_assets_arrow = None
+if "filter_options" not in st.session_state: # Sidebar filter choices, computed once per load by build_filter_options()
+    st.session_state.filter_options = {}
+if "asset_cache_checked" not in st.session_state: # The disk cache is only consulted once per session
+    st.session_state.asset_cache_checked = False
+if "assets_load_id" not in st.session_state: # Identifies the current all_loaded_assets_df in the filter cache; renewed on every load
+    st.session_state.assets_load_id = None
 
 # Session state variables for Form Analyser tab
 if "xml_form_details" not in st.session_state: # Stores list of {'form_name': ..., 'uid': ..., 'columns': [...]} from form definitions
     st.session_state.xml_form_details = []
 if "all_xml_column_names" not in st.session_state:
     st.session_state.all_xml_column_names = set() # Stores a set of all unique column names found from form definitions
+if "all_xml_column_names_normalized" not in st.session_state:
+    st.session_state.all_xml_column_names_normalized = [] # rapidfuzz-normalized column names, index-aligned with all_xml_column_names; computed once per analysis
+# Columnar (CSR) view of the terms in xml_form_details: form i owns xml_form_term_ids[offsets[i]:offsets[i + 1]],
+# where each id is a position in all_xml_column_names
+if "xml_form_term_offsets" not in st.session_state:
+    st.session_state.xml_form_term_offsets = np.zeros(1, dtype=np.int64)
+if "xml_form_term_ids" not in st.session_state:
+    st.session_state.xml_form_term_ids = np.zeros(0, dtype=np.int64)
+if "xml_analysis_id" not in st.session_state: # Identifies the current analysis in the fuzzy score cache; renewed on every analysis
+    st.session_state.xml_analysis_id = None
 if "xml_forms_processed" not in st.session_state:
     st.session_state.xml_forms_processed = False
 if "keyword_match_results" not in st.session_state: # New state for keyword matching results
     st.session_state.keyword_match_results = pd.DataFrame()
 
-# New session state for Form Analyser inputs to prevent reset on type/rerun
-if "analyser_keywords_input" not in st.session_state:
-    st.session_state.analyser_keywords_input = ""
-if "analyser_fuzzy_threshold" not in st.session_state:
-    st.session_state.analyser_fuzzy_threshold = 80
-if "analyser_fuzzy_method" not in st.session_state:
-    st.session_state.analyser_fuzzy_method = "Token Set Ratio (fuzz.token_set_ratio)" # Set initial default
-
 
 # --- Sidebar: Authentication & Fetch Buttons ---
 # Compacted layout for sidebar
@@ -67,6 +538,13 @@ with st.sidebar:
     api_token = api_token_input
 
     st.checkbox("Include Only Surveys (applied to loaded assets)", value=True, key="include_surveys_only", help="Filters asset types during initial data load.")
+    st.checkbox(
+        "Keep loaded projects in a local cache", value=True, key="use_asset_cache",
+        help=f"Saves the loaded project metadata (including owner names and descriptions) under {ASSET_CACHE_DIR} for an hour, "
+             "so a page refresh or an identical reload does not re-fetch it. Untick to stop using it and delete this token's cached files."
+    )
+    if not st.session_state.use_asset_cache and api_token and server_url:
+        clear_assets_cache(server_url, api_token)
 
     st.header("Data Source Selection")
     data_source_option = st.radio(
@@ -76,6 +554,18 @@ with st.sidebar:
         help="Project Views API allows filtering by Kobo project views. Regular Assets API fetches all accessible surveys directly."
     )
 
+    # Restore the assets last loaded with these exact settings (e.g. after a page refresh) instead of re-fetching.
+    # Only the direct source is fully described by the sidebar here; project views are matched once selected and loaded.
+    if (api_token and server_url and st.session_state.use_asset_cache and data_source_option == "Regular Assets API"
+            and not st.session_state.asset_cache_checked):
+        st.session_state.asset_cache_checked = True
+        cached_assets = load_assets_cache(
+            asset_cache_path(server_url, api_token, data_source_option, st.session_state.include_surveys_only)
+        )
+        if cached_assets is not None and not cached_assets.empty and not st.session_state.assets_loaded:
+            store_loaded_assets(cached_assets) # Not written back, so the cache file keeps its original age
+            st.info(f"Restored {len(cached_assets)} previously loaded assets from the local cache.")
+
     # Container for dynamic status messages and progress bars in sidebar
     sidebar_status_container = st.empty() # This empty container will be filled dynamically
     sidebar_progress_bar = sidebar_status_container.progress(0)
@@ -95,7 +585,7 @@ with st.sidebar:
                 # Reset primary asset-related session states ONLY
                 st.session_state.project_views_fetched = False
                 st.session_state.available_project_views = []
-                st.session_state.loaded_assets_from_views = [] # Clear previously loaded assets
+                st.session_state.loaded_assets_from_views = pd.DataFrame() # Clear previously loaded assets
                 st.session_state.assets_loaded = False
                 st.session_state.filtered_projects_df = pd.DataFrame()
                 st.session_state.filters_applied = False
@@ -139,34 +629,37 @@ with st.sidebar:
                 sidebar_status_text.empty() # Clear if error
             else:
                 # Reset primary asset-related session states ONLY
-                st.session_state.loaded_assets_from_views = []
+                st.session_state.loaded_assets_from_views = pd.DataFrame()
                 st.session_state.assets_loaded = False
                 st.session_state.filtered_projects_df = pd.DataFrame() # Clear before new load
                 st.session_state.filters_applied = False
                 st.session_state.all_loaded_assets_df = pd.DataFrame()
                 # DO NOT reset form analyser states here (xml_forms_processed, xml_form_details etc.)
 
+                cache_path = asset_cache_path(
+                    server_url, api_token, data_source_option, st.session_state.include_surveys_only, selected_pv_uids_for_loading
+                ) if st.session_state.use_asset_cache else None
+                cached_assets = load_assets_cache(cache_path) if cache_path else None
+
                 with st.spinner("Loading assets from selected project views..."): 
-                    st.session_state.loaded_assets_from_views = kobo_api.fetch_assets_for_project_views(
-                        selected_pv_uids_for_loading, 
-                        api_token, 
-                        server_url,
-                        st.session_state.include_surveys_only,
-                        progress_bar=sidebar_progress_bar, # Pass progress bar
-                        status_text=sidebar_status_text # Pass status text
-                    )
-                    if st.session_state.loaded_assets_from_views:
-                        st.session_state.assets_loaded = True
-                        df_temp = pd.DataFrame(st.session_state.loaded_assets_from_views).drop_duplicates(subset=['UID'])
-                        df_temp["Date Created"] = pd.to_datetime(df_temp["Date Created"], errors='coerce').dt.tz_localize(None)
-                        df_temp["Date Modified"] = pd.to_datetime(df_temp["Date Modified"], errors='coerce').dt.tz_localize(None)
-                        
-                        st.session_state.all_loaded_assets_df = df_temp.copy() # Populate for filter options
-                        st.session_state.filtered_projects_df = df_temp.copy() # Set filtered_projects_df initially to all loaded
-                        st.session_state.filters_applied = True # Indicate filters can be applied now
-                        sidebar_status_text.success(f"Successfully loaded {len(df_temp)} unique asset(s) from selected project views.")
+                    if cached_assets is not None and not cached_assets.empty:
+                        # The same views were loaded with the same settings within ASSET_CACHE_TTL
+                        df_temp = store_loaded_assets(cached_assets)
+                        sidebar_status_text.success(f"Restored {len(df_temp)} unique asset(s) for the selected project views from the local cache.")
                     else:
-                        sidebar_status_text.error("Failed to load any assets for the selected views. Check your token and selections.")
+                        st.session_state.loaded_assets_from_views = kobo_api.fetch_assets_for_project_views(
+                            selected_pv_uids_for_loading, 
+                            api_token, 
+                            server_url,
+                            st.session_state.include_surveys_only,
+                            progress_bar=sidebar_progress_bar, # Pass progress bar
+                            status_text=sidebar_status_text # Pass status text
+                        )
+                        if not st.session_state.loaded_assets_from_views.empty:
+                            df_temp = store_loaded_assets(st.session_state.loaded_assets_from_views, cache_path)
+                            sidebar_status_text.success(f"Successfully loaded {len(df_temp)} unique asset(s) from selected project views.")
+                        else:
+                            sidebar_status_text.error("Failed to load any assets for the selected views. Check your token and selections.")
                 
                 sidebar_progress_bar.empty()
 
@@ -184,7 +677,7 @@ with st.sidebar:
                 # Reset primary asset-related session states ONLY
                 st.session_state.project_views_fetched = False # Not using project views
                 st.session_state.available_project_views = []
-                st.session_state.loaded_assets_from_views = [] 
+                st.session_state.loaded_assets_from_views = pd.DataFrame() 
                 st.session_state.assets_loaded = False
                 st.session_state.filtered_projects_df = pd.DataFrame() # Clear before new load
                 st.session_state.filters_applied = False
@@ -199,16 +692,11 @@ with st.sidebar:
                         progress_bar=sidebar_progress_bar, # Pass progress bar
                         status_text=sidebar_status_text # Pass status text
                     )
-                    if fetched_assets:
-                        st.session_state.loaded_assets_from_views = fetched_assets
-                        st.session_state.assets_loaded = True
-                        df_temp = pd.DataFrame(st.session_state.loaded_assets_from_views).drop_duplicates(subset=['UID'])
-                        df_temp["Date Created"] = pd.to_datetime(df_temp["Date Created"], errors='coerce').dt.tz_localize(None)
-                        df_temp["Date Modified"] = pd.to_datetime(df_temp["Date Modified"], errors='coerce').dt.tz_localize(None)
-                        
-                        st.session_state.all_loaded_assets_df = df_temp.copy()
-                        st.session_state.filtered_projects_df = df_temp.copy()
-                        st.session_state.filters_applied = True # Indicate filters can be applied now
+                    if not fetched_assets.empty:
+                        cache_path = asset_cache_path(
+                            server_url, api_token, data_source_option, st.session_state.include_surveys_only
+                        ) if st.session_state.use_asset_cache else None
+                        df_temp = store_loaded_assets(fetched_assets, cache_path)
                         sidebar_status_text.success(f"Successfully loaded {len(df_temp)} unique assets directly from KoboToolbox.")
                     else:
                         sidebar_status_text.error("Failed to load any assets directly. Check your API token/URL or if there are assets available.")
@@ -219,6 +707,8 @@ with st.sidebar:
     if st.button("Clear App Cache"):
         st.cache_data.clear()
         st.cache_resource.clear() # Clear both types if you use resource caching too
+        if api_token and server_url:
+            clear_assets_cache(server_url, api_token) # Also drop this token's on-disk asset caches
         st.rerun()
         st.success("Cache cleared! Please re-fetch data.")
 
@@ -230,184 +720,119 @@ with tab1:
     if not st.session_state.assets_loaded:
         st.info("Please use the sidebar to select a data source and fetch project metadata.")
     else: 
-        # --- Sidebar: Apply Filters Section (Now Interactive) ---
-        st.sidebar.header("Step 3: Apply Filters (Interactive)")
-        
-        # Filter: Keyword search for Project Name (only text input now)
-        project_name_keywords_input = st.sidebar.text_input(
-            "Search Project Name (comma-separated keywords):",
-            value=st.session_state.get('project_name_keywords_input_val', ''), # Keep value on rerun
-            help="Enter one or more keywords to search in project names. Separate with commas. Projects matching ANY keyword will be shown.",
-            key="project_name_keywords_input_widget" # Changed key to avoid conflict with initial assignment
-        )
-        # Update session state for persistence across reruns caused by other widgets
-        st.session_state.project_name_keywords_input_val = project_name_keywords_input
-        project_name_keywords = [kw.strip() for kw in project_name_keywords_input.split(',') if kw.strip()]
+        # --- Sidebar: Apply Filters Section ---
+        st.sidebar.header("Step 3: Apply Filters")
+        # Filter widgets live in a form so edits are batched into one rerun when "Apply Filters" is pressed
+        with st.sidebar.form("filter_form"):
+            # Filter: Keyword search for Project Name (only text input now)
+            project_name_keywords_input = st.text_input(
+                "Search Project Name (comma-separated keywords):",
+                value=st.session_state.get('project_name_keywords_input_val', ''), # Keep value on rerun
+                help="Enter one or more keywords to search in project names. Separate with commas. Projects matching ANY keyword will be shown.",
+                key="project_name_keywords_input_widget" # Changed key to avoid conflict with initial assignment
+            )
+            # Update session state for persistence across reruns caused by other widgets
+            st.session_state.project_name_keywords_input_val = project_name_keywords_input
+            project_name_keywords = [kw.strip() for kw in project_name_keywords_input.split(',') if kw.strip()]
 
-        # Filter: Country Label
-        loaded_countries_options = sorted(st.session_state.all_loaded_assets_df["Country Label"].dropna().unique()) if not st.session_state.all_loaded_assets_df.empty else []
-        selected_countries = st.sidebar.multiselect("Country:", loaded_countries_options, key="country_label_select")
-        
-        # Filter: Project Status (Dynamically populated options)
-        # Check if "Status" column exists and is not empty before getting unique values
-        status_options_for_selection = []
-        if "Status" in st.session_state.all_loaded_assets_df.columns and not st.session_state.all_loaded_assets_df.empty:
-            status_options_for_selection = sorted(st.session_state.all_loaded_assets_df["Status"].dropna().unique().tolist())
-        
-        selected_statuses = st.sidebar.multiselect(
-            "Project Status(es)", 
-            options=status_options_for_selection, 
-            default=status_options_for_selection, # Default to all loaded statuses selected
-            help="Filter projects by their deployment status.",
-            key="status_select"
-        )
+            # Filter choices were computed once when the assets were loaded
+            filter_options = st.session_state.filter_options
 
-        # Filter: Sector (NEW)
-        # This function converts raw sector data (dict or str) into a consistent string for filtering and display
-        def get_sector_display_name(sector_item):
-            if isinstance(sector_item, dict) and sector_item: # Check if it's a non-empty dictionary
-                return sector_item.get('name') or sector_item.get('label') or str(sector_item)
-            elif isinstance(sector_item, str) and sector_item.strip(): # If it's a non-empty string
-                return sector_item
-            return None # Handle None, empty strings, or other unexpected types
-
-        # Extract unique sector options using the helper function
-        loaded_sectors_options = []
-        if "Sector" in st.session_state.all_loaded_assets_df.columns:
-            # Apply the helper function to each item in the 'Sector' column
-            # Then drop None values and get unique, then sort
-            processed_sectors = st.session_state.all_loaded_assets_df["Sector"].apply(get_sector_display_name)
-            loaded_sectors_options = sorted(processed_sectors.dropna().unique().tolist())
-
-        selected_sectors = st.sidebar.multiselect("Sector:", loaded_sectors_options, key="sector_select")
-
-
-        # New layout for Date Range and Minimum Submissions
-        # Place date inputs side by side
-        col_date_start, col_date_end = st.sidebar.columns(2)
-        with col_date_start:
-            # Filter: Date Range - From
-            valid_dates = st.session_state.all_loaded_assets_df["Date Created"].dropna()
-            min_date_val = valid_dates.min().date() if not valid_dates.empty else datetime.now().date()
-            # Ensure the date_input retains its value across reruns
-            date_start = st.date_input("Created From:", min_date_val, key="date_start_select")
-        with col_date_end:
-            # Filter: Date Range - To
-            max_date_val = valid_dates.max().date() if not valid_dates.empty else datetime.now().date()
-            # Ensure the date_input retains its value across reruns
-            date_end = st.date_input("Created To:", max_date_val, key="date_end_select")
+            # Filter: Country Label
+            loaded_countries_options = filter_options["country"]
+            selected_countries = st.multiselect("Country:", loaded_countries_options, key="country_label_select")
         
-        # Place minimum submissions below dates
-        min_submission_count = st.sidebar.number_input(
-            "Minimum Submissions:",
-            min_value=0,
-            max_value=int(st.session_state.all_loaded_assets_df["Submission Count"].max() if "Submission Count" in st.session_state.all_loaded_assets_df.columns and not st.session_state.all_loaded_assets_df.empty else 0),
-            value=st.session_state.get('min_submission_count_filter_val', 0), # Keep value on rerun
-            step=10,
-            help="Only show projects with at least this many submissions.",
-            key="min_submission_count_filter_widget" # Changed key
-        )
-        st.session_state.min_submission_count_filter_val = min_submission_count # Update session state for persistence
+            # Filter: Project Status (Dynamically populated options)
+            status_options_for_selection = filter_options["status"]
+        
+            selected_statuses = st.multiselect(
+                "Project Status(es)", 
+                options=status_options_for_selection, 
+                default=status_options_for_selection, # Default to all loaded statuses selected
+                help="Filter projects by their deployment status.",
+                key="status_select"
+            )
 
-        # --- Interactive Filtering Logic ---
-        # This block now runs automatically whenever any filter widget changes
-        filtered_df = st.session_state.all_loaded_assets_df.copy()
+            # Filter: Sector (NEW)
+            # Sector names were normalized by get_sector_display_name at load time
+            loaded_sectors_options = filter_options["sector"]
+
+            selected_sectors = st.multiselect("Sector:", loaded_sectors_options, key="sector_select")
+
+
+            # New layout for Date Range and Minimum Submissions
+            # Place date inputs side by side
+            col_date_start, col_date_end = st.columns(2)
+            with col_date_start:
+                # Filter: Date Range - From
+                min_date_val = filter_options["date_min"]
+                # Ensure the date_input retains its value across reruns
+                date_start = st.date_input("Created From:", min_date_val, key="date_start_select")
+            with col_date_end:
+                # Filter: Date Range - To
+                max_date_val = filter_options["date_max"]
+                # Ensure the date_input retains its value across reruns
+                date_end = st.date_input("Created To:", max_date_val, key="date_end_select")
         
-        if not filtered_df.empty: 
-            # Filter 1: Date Range
-            if "Date Created" in filtered_df.columns and not filtered_df["Date Created"].empty:
-                filtered_df = filtered_df[
-                    (filtered_df["Date Created"].dt.date >= date_start) &
-                    (filtered_df["Date Created"].dt.date <= date_end)
-                ]
+            # Place minimum submissions below dates
+            min_submission_count = st.number_input(
+                "Minimum Submissions:",
+                min_value=0,
+                max_value=filter_options["max_submissions"],
+                value=st.session_state.get('min_submission_count_filter_val', 0), # Keep value on rerun
+                step=10,
+                help="Only show projects with at least this many submissions.",
+                key="min_submission_count_filter_widget" # Changed key
+            )
+            st.session_state.min_submission_count_filter_val = min_submission_count # Update session state for persistence
 
-            # Filter 2: Project Name Keyword Search (using single text input)
-            if project_name_keywords:
-                if "Name" in filtered_df.columns:
-                    pattern = "|".join(re.escape(word) for word in project_name_keywords if word)
-                    if pattern:
-                        filtered_df = filtered_df[filtered_df["Name"].str.contains(pattern, case=False, na=False, regex=True)]
-                else:
-                    st.warning("Project Name column not found for keyword search.")
-                    
-            # Filter 3: Country Label
-            if selected_countries: # Only filter if selections are made
-                if "Country Label" in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df["Country Label"].isin(selected_countries)]
-                else:
-                    st.warning("Country Label column not found for country filter.")
+            # Filter: Operational Purpose
+            if filter_options["operational_purpose"] is not None:
+                operational_purposes = filter_options["operational_purpose"]
+                selected_operational_purposes = st.multiselect("Operational Purpose:", operational_purposes, key="operational_purpose_select")
+            else:
+                selected_operational_purposes = []
 
-            # Filter 4: Project Status (Re-added logic, using selected_statuses)
-            if selected_statuses:
-                if "Status" in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df["Status"].isin(selected_statuses)]
-                else:
-                    st.warning("Status column not found for project status filter.")
-            else: # If user explicitly selects no statuses, filter out everything based on status
-                if "Status" in filtered_df.columns:
-                    filtered_df = pd.DataFrame() # An empty DataFrame if no status is selected
+            # Filter: Collects PII
+            if filter_options["collects_pii"] is not None:
+                collects_pii_options = filter_options["collects_pii"]
+                selected_collects_pii = st.multiselect("Collects PII:", collects_pii_options, key="collects_pii_select")
+            else:
+                selected_collects_pii = []
+
+            # Filter: Description (keyword match)
+            description_keywords_input = st.text_input(
+                "Search Description (keywords):",
+                value=st.session_state.get('description_keywords_input_val', ''),
+                help="Enter keywords to search in the description.",
+                key="description_keywords_input_widget"
+            )
+            st.session_state.description_keywords_input_val = description_keywords_input
+            description_keywords = [kw.strip() for kw in description_keywords_input.split(',') if kw.strip()]
 
-            
-        # Filter: Operational Purpose
-        if "Operational Purpose" in st.session_state.all_loaded_assets_df.columns:
-            operational_purposes = sorted(st.session_state.all_loaded_assets_df["Operational Purpose"].dropna().unique().tolist())
-            selected_operational_purposes = st.sidebar.multiselect("Operational Purpose:", operational_purposes, key="operational_purpose_select")
-        else:
-            selected_operational_purposes = []
+            st.form_submit_button("Apply Filters")
 
-        # Filter: Collects PII
-        if "Collects PII" in st.session_state.all_loaded_assets_df.columns:
-            collects_pii_options = st.session_state.all_loaded_assets_df["Collects PII"].dropna().unique().tolist()
-            selected_collects_pii = st.sidebar.multiselect("Collects PII:", collects_pii_options, key="collects_pii_select")
-        else:
-            selected_collects_pii = []
-
-        # Filter: Description (keyword match)
-        description_keywords_input = st.sidebar.text_input(
-            "Search Description (keywords):",
-            value=st.session_state.get('description_keywords_input_val', ''),
-            help="Enter keywords to search in the description.",
-            key="description_keywords_input_widget"
+        # --- Interactive Filtering Logic ---
+        # Runs on every rerun with the last applied filter values; identical filter states are served from the cache
+        filter_values = (
+            date_start,
+            date_end,
+            tuple(project_name_keywords),
+            tuple(selected_countries),
+            tuple(selected_statuses),
+            tuple(selected_sectors),
+            tuple(selected_operational_purposes),
+            tuple(selected_collects_pii),
+            tuple(description_keywords),
+            min_submission_count
         )
-        st.session_state.description_keywords_input_val = description_keywords_input
-        description_keywords = [kw.strip() for kw in description_keywords_input.split(',') if kw.strip()]
-
-
-        
-        # Filter: Operational Purpose
-        if "Operational Purpose" in filtered_df.columns and selected_operational_purposes:
-            filtered_df = filtered_df[filtered_df["Operational Purpose"].isin(selected_operational_purposes)]
-
-        # Filter: Collects PII
-        if "Collects PII" in filtered_df.columns and selected_collects_pii:
-            filtered_df = filtered_df[filtered_df["Collects PII"].isin(selected_collects_pii)]
-
-        # Filter: Description
-        if "Description" in filtered_df.columns and description_keywords:
-            pattern = "|".join(re.escape(word) for word in description_keywords if word)
-            if pattern:
-                filtered_df = filtered_df[filtered_df["Description"].str.contains(pattern, case=False, na=False, regex=True)]
-
-        # Filter 5: Sector (NEW Logic)
-        if selected_sectors:
-            if "Sector" in filtered_df.columns:
-                # Apply the same helper function to the DataFrame column for filtering
-                filtered_df = filtered_df[
-                    filtered_df["Sector"].apply(lambda x: get_sector_display_name(x) in selected_sectors)
-                ]
-            else:
-                st.warning("Sector column not found for sector filter.")
-        
-        # Filter 6: Minimum Submission Count
-        if "Submission Count" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Submission Count"] >= min_submission_count]
-        else:
-            st.warning("Submission Count column not found for minimum submissions filter.")
+        filtered_df = apply_project_filters(st.session_state.all_loaded_assets_df, st.session_state.assets_load_id, *filter_values)
 
         st.session_state.filtered_projects_df = filtered_df
+        st.session_state.filtered_projects_key = (st.session_state.assets_load_id,) + filter_values # Identifies filtered_projects_df for cached aggregates
         st.session_state.filters_applied = True # Keep this flag if it's used elsewhere for display logic
 
-        current_display_df = st.session_state.filtered_projects_df.copy() # Refresh the displayed df
+        current_display_df = st.session_state.filtered_projects_df # Read-only below, so no copy is needed
 
         # --- Display Section of tab1 ---
         st.subheader("Current Project Statistics")
@@ -421,25 +846,15 @@ with tab1:
 
         st.write(f"### Current Projects Displayed ({len(current_display_df)})")
         
-        # Define columns to display and their order for the main table
-        display_cols_order = [
-            "Name", "UID", "Status", "Submission Count", 
-            "Date Created", "Date Modified", "Country Label", "Sector", 
-            "Source View Name", "Owner Username"
-        ]
-        
-        # Prepare 'Sector' column for display, converting dicts to strings
-        display_df_for_table = current_display_df.copy()
-        if "Sector" in display_df_for_table.columns:
-            display_df_for_table["Sector"] = display_df_for_table["Sector"].apply(get_sector_display_name)
-
-
-        # Ensure all display columns exist, if not, fill with None or skip
-        actual_display_cols = [col for col in display_cols_order if col in display_df_for_table.columns] 
+        # The display columns (DISPLAY_COLUMNS) were converted to Arrow at load time;
+        # take the filtered rows from that table rather than re-serializing the pandas frame on every rerun
+        display_table = st.session_state.all_loaded_assets_arrow.take(
+            st.session_state.all_loaded_assets_df.index.get_indexer(current_display_df.index)
+        )
         
-        if not display_df_for_table.empty and actual_display_cols:
-            st.dataframe(display_df_for_table[actual_display_cols], use_container_width=True)
-        elif not display_df_for_table.empty:
+        if not current_display_df.empty and display_table.num_columns:
+            st.dataframe(display_table, use_container_width=True)
+        elif not current_display_df.empty:
             st.info("No displayable columns found in the loaded data.")
         else:
             st.info("No projects loaded or matching current filters.")
@@ -453,10 +868,8 @@ with tab2:
     elif st.session_state.filtered_projects_df.empty:
         st.info("No data available for analytics. **Apply filters** in the 'Project Browser' tab or load more assets.")
     else:
-        analytics_df = st.session_state.filtered_projects_df.copy()
-
-        analytics_df["Date Created"] = pd.to_datetime(analytics_df["Date Created"], errors='coerce')
-        analytics_df.dropna(subset=["Date Created"], inplace=True) 
+        # 'Date Created' is already parsed at load time; dropna makes the one copy this tab needs
+        analytics_df = st.session_state.filtered_projects_df.dropna(subset=["Date Created"])
 
         # --- Key Stats for Analytics Dashboard (Duplicated from Project Browser) ---
         st.subheader("Current Project Statistics (Based on Applied Filters)")
@@ -474,17 +887,11 @@ with tab2:
         with chart_col1:
             st.subheader("1. Number of Projects by Country")
             if not analytics_df.empty:
-                assets_by_country = analytics_df["Country Label"].value_counts().reset_index()
+                assets_by_country = count_projects_by(analytics_df, st.session_state.filtered_projects_key, "Country Label")
                 assets_by_country.columns = ["Country", "Project Count"] 
                 
-                chart_assets_by_country = alt.Chart(assets_by_country).mark_bar().encode(
-                    y=alt.Y("Country:N", sort="-x", title="Country"),
-                    x=alt.X("Project Count:Q", title="Number of Projects"),
-                    tooltip=["Country", "Project Count"]
-                ).properties(
-                    title="Projects by Country"
-                ).interactive()
-                st.altair_chart(chart_assets_by_country, use_container_width=True)
+                chart_assets_by_country = bar_chart_spec("Country", "Project Count", "Country", "Number of Projects", "Projects by Country")
+                st.vega_lite_chart(assets_by_country, chart_assets_by_country, use_container_width=True)
             else:
                 st.info("No project data to show analytics by country.")
 
@@ -501,19 +908,27 @@ with tab2:
                     top_n_for_trend = 1 # For display text, not used by slider
                 else: # max_slider_val >= 2, so slider is safe
                     top_n_for_trend = st.slider("Select number of top projects to display (for trend):", 1, min(10, max_slider_val), min(5, max_slider_val), key="top_projects_slider_tab2")
-                    top_projects_for_chart = analytics_df.nlargest(top_n_for_trend, "Submission Count").copy()
+                    top_projects_for_chart = top_n_rows(analytics_df, "Submission Count", top_n_for_trend)
                     
                 if not analytics_df.empty: # Check analytics_df after handling max_slider_val == 1
                     if "top_projects_for_chart" in locals() and not top_projects_for_chart.empty:
-                        chart_top_submissions = alt.Chart(top_projects_for_chart).mark_circle(size=100).encode(
-                            x=alt.X("Date Created:T", title="Project Creation Date"),
-                            y=alt.Y("Submission Count:Q", title="Submission Count"),
-                            color=alt.Color("Name:N", title="Project Name"),
-                            tooltip=["Name", alt.Tooltip("Date Created", format="%Y-%m-%d"), "Submission Count"]
-                        ).properties(
-                            title=f"Submission Count for Top {top_n_for_trend} Projects (at Creation Date)"
-                        ).interactive()
-                        st.altair_chart(chart_top_submissions, use_container_width=True)
+                        chart_top_submissions = {
+                            "mark": {"type": "circle", "size": 100},
+                            "encoding": {
+                                "x": {"field": "Date Created", "type": "temporal", "title": "Project Creation Date"},
+                                "y": {"field": "Submission Count", "type": "quantitative", "title": "Submission Count"},
+                                "color": {"field": "Name", "type": "nominal", "title": "Project Name"},
+                                "tooltip": [
+                                    {"field": "Name", "type": "nominal"},
+                                    {"field": "Date Created", "type": "temporal", "format": "%Y-%m-%d"},
+                                    {"field": "Submission Count", "type": "quantitative"}
+                                ]
+                            },
+                            "title": f"Submission Count for Top {top_n_for_trend} Projects (at Creation Date)",
+                            "params": INTERACTIVE_CHART_PARAMS
+                        }
+                        # Only the encoded columns are sent to the browser
+                        st.vega_lite_chart(top_projects_for_chart[["Name", "Date Created", "Submission Count"]], chart_top_submissions, use_container_width=True)
                     else:
                         st.info(f"Not enough data to display top projects chart.") # Fallback if for some reason top_projects_for_chart is empty
                 else:
@@ -522,17 +937,13 @@ with tab2:
             st.markdown("---")
             st.subheader("5. Projects by Source View")
             if "Source View Name" in analytics_df.columns and not analytics_df.empty:
-                projects_by_source_view = analytics_df["Source View Name"].value_counts().reset_index()
+                projects_by_source_view = fold_small_categories(
+                    count_projects_by(analytics_df, st.session_state.filtered_projects_key, "Source View Name")
+                )
                 projects_by_source_view.columns = ["Source View", "Project Count"]
                 
-                chart_projects_by_source = alt.Chart(projects_by_source_view).mark_bar().encode(
-                    y=alt.Y("Source View:N", sort="-x", title="Source View"),
-                    x=alt.X("Project Count:Q", title="Number of Projects"),
-                    tooltip=["Source View", "Project Count"]
-                ).properties(
-                    title="Projects by Source View"
-                ).interactive()
-                st.altair_chart(chart_projects_by_source, use_container_width=True)
+                chart_projects_by_source = bar_chart_spec("Source View", "Project Count", "Source View", "Number of Projects", "Projects by Source View")
+                st.vega_lite_chart(projects_by_source_view, chart_projects_by_source, use_container_width=True)
             else:
                 st.info("Source View data not available or no projects to display.")
 
@@ -549,20 +960,17 @@ with tab2:
                     top_n_submissions_projects = 1 # For display text, not used by slider
                 else: # max_slider_val_sub >= 2
                     top_n_submissions_projects = st.slider("Show Top N Projects by Submissions:", 1, min(20, max_slider_val_sub), min(10, max_slider_val_sub), key="top_sub_projects_slider")
-                    projects_by_submissions = analytics_df.nlargest(top_n_submissions_projects, "Submission Count").copy()
+                    projects_by_submissions = top_n_rows(analytics_df, "Submission Count", top_n_submissions_projects).copy() # Sorted in place below
                 
                 if not analytics_df.empty: # Check analytics_df after handling max_slider_val_sub == 1
                     if "projects_by_submissions" in locals() and not projects_by_submissions.empty:
                         projects_by_submissions.sort_values(by="Submission Count", ascending=False, inplace=True) 
 
-                        chart_total_submissions_per_project = alt.Chart(projects_by_submissions).mark_bar().encode(
-                            y=alt.Y("Name:N", sort="-x", title="Project Name"),
-                            x=alt.X("Submission Count:Q", title="Total Submissions"),
-                            tooltip=["Name", "Submission Count"]
-                        ).properties(
-                            title=f"Top {top_n_submissions_projects} Projects by Total Submissions"
-                        ).interactive()
-                        st.altair_chart(chart_total_submissions_per_project, use_container_width=True)
+                        chart_total_submissions_per_project = bar_chart_spec(
+                            "Name", "Submission Count", "Project Name", "Total Submissions",
+                            f"Top {top_n_submissions_projects} Projects by Total Submissions"
+                        )
+                        st.vega_lite_chart(projects_by_submissions[["Name", "Submission Count"]], chart_total_submissions_per_project, use_container_width=True)
                     else:
                         st.info("No project data to show total submissions per project chart.") # Fallback
                 else:
@@ -572,19 +980,14 @@ with tab2:
 
             st.subheader("4. Projects Created Over Time (Monthly)")
             if not analytics_df.empty:
-                projects_created_monthly = analytics_df.groupby(pd.Grouper(key="Date Created", freq="M")).size().reset_index(name="Project Count")
-                projects_created_monthly.columns = ["Month", "Project Count"]
-                projects_created_monthly["Month"] = projects_created_monthly["Month"].dt.strftime("%Y-%m")
+                projects_created_monthly = count_projects_by_month(analytics_df, st.session_state.filtered_projects_key, "Date Created")
 
                 if not projects_created_monthly.empty:
-                    chart_projects_over_time = alt.Chart(projects_created_monthly).mark_bar().encode(
-                        x=alt.X("Month:O", title="Month Created", sort=None), 
-                        y=alt.Y("Project Count:Q", title="Number of Projects"),
-                        tooltip=["Month", "Project Count"]
-                    ).properties(
-                        title="Number of Projects Created Per Month"
-                    ).interactive()
-                    st.altair_chart(chart_projects_over_time, use_container_width=True)
+                    chart_projects_over_time = bar_chart_spec(
+                        "Month", "Project Count", "Month Created", "Number of Projects",
+                        "Number of Projects Created Per Month", horizontal=False
+                    )
+                    st.vega_lite_chart(projects_created_monthly, chart_projects_over_time, use_container_width=True)
                 else:
                     st.info("Not enough data to show projects created over time.")
             else:
@@ -606,16 +1009,33 @@ with tab3:
             st.session_state.xml_forms_processed = False 
             st.session_state.xml_form_details = []
             st.session_state.all_xml_column_names = set()
+            st.session_state.all_xml_column_names_normalized = []
+            st.session_state.xml_form_term_offsets = np.zeros(1, dtype=np.int64)
+            st.session_state.xml_form_term_ids = np.zeros(0, dtype=np.int64)
             st.session_state.keyword_match_results = pd.DataFrame() 
 
             with st.spinner("Fetching and analyzing form definitions... This may take a moment for many projects."): 
                 form_data, unique_terms = kobo_api.fetch_and_parse_form_definitions( 
-                    st.session_state.filtered_projects_df, 
+                    tuple(st.session_state.filtered_projects_df[["UID", "Name", "Date Modified"]].itertuples(index=False, name=None)), 
                     api_token, 
                     server_url
                 )
                 st.session_state.xml_form_details = form_data 
                 st.session_state.all_xml_column_names = sorted(list(unique_terms)) 
+                # Normalize (lowercase, strip punctuation) once here rather than on every comparison of every search
+                st.session_state.all_xml_column_names_normalized = [
+                    utils.default_process(str(term)) for term in st.session_state.all_xml_column_names
+                ]
+                # Flatten each form's terms into one id array plus offsets, so a search can score every term once
+                term_position = {term: i for i, term in enumerate(st.session_state.all_xml_column_names)}
+                term_counts = [len(form_detail["Columns"]) for form_detail in form_data]
+                st.session_state.xml_form_term_offsets = np.concatenate(([0], np.cumsum(term_counts, dtype=np.int64)))
+                st.session_state.xml_form_term_ids = np.fromiter(
+                    (term_position[term] for form_detail in form_data for term in form_detail["Columns"]),
+                    dtype=np.int64,
+                    count=int(st.session_state.xml_form_term_offsets[-1])
+                )
+                st.session_state.xml_analysis_id = uuid.uuid4().hex
                 st.session_state.xml_forms_processed = True
                 
                 if form_data: 
@@ -628,23 +1048,20 @@ with tab3:
         st.markdown("---")
         st.subheader("Search Data Column Names with Keywords")
 
-        # Use on_change to update session state only when user explicitly changes value
+        # Widget values persist across reruns under their keys, so the returned values are used directly
         search_keywords_input = st.text_input(
             "Enter keywords (comma-separated):", 
-            value=st.session_state.analyser_keywords_input,
-            key="form_analyser_keywords_widget", # Unique key for the widget
-            on_change=lambda: st.session_state.__setitem__('analyser_keywords_input', st.session_state.form_analyser_keywords_widget) # Update session state on change
+            value="",
+            key="form_analyser_keywords_widget" # Unique key for the widget
         )
-        # Use the session state variable for actual processing
-        search_keywords = [kw.strip().lower() for kw in st.session_state.analyser_keywords_input.split(',') if kw.strip()]
+        search_keywords = [kw.strip().lower() for kw in search_keywords_input.split(',') if kw.strip()]
+        normalized_keywords = [utils.default_process(kw) for kw in search_keywords]
         
-        # Use session state for the slider as well
         fuzzy_threshold = st.slider(
             "Fuzzy Matching Threshold (%)", 
             0, 100, 
-            value=st.session_state.analyser_fuzzy_threshold, 
-            key="form_analyser_fuzzy_threshold_widget",
-            on_change=lambda: st.session_state.__setitem__('analyser_fuzzy_threshold', st.session_state.form_analyser_fuzzy_threshold_widget)
+            value=80, 
+            key="form_analyser_fuzzy_threshold_widget"
         )
         
         st.markdown("##### Select Fuzzy Matching Method:")
@@ -659,10 +1076,9 @@ with tab3:
         selected_fuzzy_method_name = st.radio(
             "Choose a method:",
             list(fuzzy_method_options.keys()),
-            index=list(fuzzy_method_options.keys()).index(st.session_state.analyser_fuzzy_method), # Set default from session state
+            index=list(fuzzy_method_options.keys()).index("Token Set Ratio (fuzz.token_set_ratio)"), # Recommended default
             help="Select the fuzzy matching algorithm based on your needs for string similarity.",
-            key="fuzzy_method_selector_widget", # Unique key for widget
-            on_change=lambda: st.session_state.__setitem__('analyser_fuzzy_method', st.session_state.fuzzy_method_selector_widget) # Update session state on change
+            key="fuzzy_method_selector_widget" # Unique key for widget
         )
         st.info(f"**Method Description**: {fuzzy_method_options[selected_fuzzy_method_name]}")
 
@@ -671,60 +1087,55 @@ with tab3:
             if not search_keywords:
                 st.warning("Please enter at least one keyword to search.")
             else:
-                # Map selected method name to the actual fuzzywuzzy function
-                fuzzy_function_map = {
-                    "Simple Ratio (fuzz.ratio)": fuzz.ratio,
-                    "Partial Ratio (fuzz.partial_ratio)": fuzz.partial_ratio,
-                    "Token Sort Ratio (fuzz.token_sort_ratio)": fuzz.token_sort_ratio,
-                    "Token Set Ratio (fuzz.token_set_ratio)": fuzz.token_set_ratio,
-                    "Weighted Ratio (fuzz.WRatio)": fuzz.WRatio,
-                }
-                current_fuzzy_function = fuzzy_function_map[st.session_state.analyser_fuzzy_method] # Use session state for method
-
-
-                results = []
                 if st.session_state.all_loaded_assets_df.empty:
                     st.error("Project metadata not fully loaded. Please fetch assets in 'Project Browser' tab first.")
                 else:
-                    with st.spinner(f"Searching for keywords in {len(st.session_state.xml_form_details)} forms using {st.session_state.analyser_fuzzy_method}..."): # Use session state for method
-                        for form_detail in st.session_state.xml_form_details:
-                            form_name = form_detail["Form Name"]
-                            form_uid = form_detail["UID"]
-                            columns = form_detail["Columns"] 
-                            
-                            owner_username = "N/A"
-                            matching_asset = st.session_state.all_loaded_assets_df[
-                                st.session_state.all_loaded_assets_df['UID'] == form_uid
+                    with st.spinner(f"Searching for keywords in {len(st.session_state.xml_form_details)} forms using {selected_fuzzy_method_name}..."):
+                        all_terms = st.session_state.all_xml_column_names
+                        term_offsets = st.session_state.xml_form_term_offsets
+                        term_ids = st.session_state.xml_form_term_ids
+
+                        # Scores are cached per analysis, keywords and method; only the threshold is applied here
+                        term_matched = best_term_scores(
+                            st.session_state.all_xml_column_names_normalized, # Same order as all_terms
+                            st.session_state.xml_analysis_id,
+                            tuple(normalized_keywords),
+                            selected_fuzzy_method_name
+                        ) >= fuzzy_threshold
+
+                        # Map matching term occurrences back to their forms through the offsets
+                        hit_positions = np.flatnonzero(term_matched[term_ids])
+                        hit_forms = np.searchsorted(term_offsets, hit_positions, side="right") - 1
+                        hits_by_form = np.split(hit_positions, np.searchsorted(hit_positions, term_offsets[1:-1]))
+
+                        # One dict lookup per matched form instead of a scan of all assets (UIDs are unique since load)
+                        uid_to_owner = dict(zip(
+                            st.session_state.all_loaded_assets_df["UID"],
+                            st.session_state.all_loaded_assets_df["Owner Username"]
+                        ))
+
+                        # Results are collected column by column and assembled into a DataFrame once
+                        match_counts = np.bincount(hit_forms, minlength=len(st.session_state.xml_form_details))
+                        matched_forms = np.flatnonzero(match_counts)
+                        matched_details = [st.session_state.xml_form_details[form_index] for form_index in matched_forms]
+                        matched_uids = [form_detail["UID"] for form_detail in matched_details]
+
+                        st.session_state.keyword_match_results = pd.DataFrame({
+                            "Form Name": [form_detail["Form Name"] for form_detail in matched_details],
+                            "UID": matched_uids,
+                            "Owner Username": [uid_to_owner.get(form_uid, "N/A") for form_uid in matched_uids],
+                            "Number of Keyword Matches": match_counts[matched_forms].astype(np.int32),
+                            "Matched Terms": [
+                                ", ".join(sorted({all_terms[term_id] for term_id in term_ids[hits_by_form[form_index]]}))
+                                for form_index in matched_forms
                             ]
-                            if not matching_asset.empty:
-                                owner_username = matching_asset['Owner Username'].iloc[0] 
-                            
-                            match_count = 0
-                            matched_terms_for_display = [] 
-
-                            for term in columns: 
-                                for keyword in search_keywords: # Use search_keywords derived from analyser_keywords_input
-                                    if current_fuzzy_function(str(term).lower(), keyword) >= st.session_state.analyser_fuzzy_threshold: # Use session state for threshold
-                                        match_count += 1
-                                        matched_terms_for_display.append(term) 
-                                        break 
-
-                            if match_count > 0:
-                                results.append({
-                                    "Form Name": form_name,
-                                    "UID": form_uid,
-                                    "Owner Username": owner_username,
-                                    "Number of Keyword Matches": match_count,
-                                    "Matched Terms": ", ".join(sorted(list(set(matched_terms_for_display)))) 
-                                })
-                    
-                    st.session_state.keyword_match_results = pd.DataFrame(results)
+                        })
 
                 if not st.session_state.keyword_match_results.empty:
-                    st.write(f"#### Forms with Keyword Matches (Threshold: {st.session_state.analyser_fuzzy_threshold}%, Method: {st.session_state.analyser_fuzzy_method})") # Use session state for display
+                    st.write(f"#### Forms with Keyword Matches (Threshold: {fuzzy_threshold}%, Method: {selected_fuzzy_method_name})")
                     st.dataframe(st.session_state.keyword_match_results, use_container_width=True)
                 else:
-                    st.info(f"No forms found with columns/labels matching your keywords above the set threshold using {st.session_state.analyser_fuzzy_method}.") # Use session state for display
+                    st.info(f"No forms found with columns/labels matching your keywords above the set threshold using {selected_fuzzy_method_name}.")
 
     elif st.session_state.xml_forms_processed and not st.session_state.xml_form_details:
         st.warning("No form definitions were processed from the filtered projects. This might be because no assets match your filters, or there was an issue fetching/parsing the definitions for the available assets. Check the 'Project Browser' tab for loaded assets and ensure your API token/server URL are correct.") 
@@ -745,26 +1156,11 @@ with tab4:
         
         # --- 1. Project Metadata Export ---
         st.subheader("1. Project Metadata Export (for All Displayed Projects)")
-        excel_buffer_filtered = io.BytesIO()
-        filtered_for_download = st.session_state.filtered_projects_df.copy()
-        
-        # Prepare 'Sector' column for display, converting dicts to strings for export
-        if "Sector" in filtered_for_download.columns:
-            filtered_for_download["Sector"] = filtered_for_download["Sector"].apply(lambda x: 
-                (x.get('name') or x.get('label') or str(x)) if isinstance(x, dict) and x else (str(x) if x is not None else None)
-            )
-        
-        # Convert datetime columns to timezone-naive for Excel compatibility
-        for col in ["Date Created", "Date Modified"]:
-            if pd.api.types.is_datetime64_any_dtype(filtered_for_download[col]) and filtered_for_download[col].dt.tz is not None:
-                filtered_for_download[col] = filtered_for_download[col].dt.tz_localize(None)
-        
-        # Export ALL available columns in the filtered_projects_df
-        filtered_for_download.to_excel(excel_buffer_filtered, index=False, columns=filtered_for_download.columns.tolist())
-        excel_buffer_filtered.seek(0)
+        # Export ALL available columns in the filtered_projects_df; rebuilt only when the filtered projects change
+        excel_bytes_filtered = build_metadata_excel(st.session_state.filtered_projects_df, st.session_state.filtered_projects_key)
         st.download_button(
             "Download Displayed Project Metadata (Excel)", 
-            data=excel_buffer_filtered, 
+            data=excel_bytes_filtered, 
             file_name="displayed_projects_metadata.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             help="Downloads all available metadata columns of projects currently displayed in the 'Project Browser' table."
@@ -775,28 +1171,39 @@ with tab4:
         # --- 2. XLSForm Downloads ---
         st.subheader("2. XLSForm Downloads (for All Displayed Projects)")
         st.info("This will download the raw XLSForm definition file for each project currently displayed/filtered.")
-        
-        uids_for_download = st.session_state.filtered_projects_df['UID'].tolist()
-        names_for_download = st.session_state.filtered_projects_df['Name'].tolist() 
 
         if st.button("Download All Displayed XLS Forms (ZIP)", key="dl_all_xls_forms_displayed"):
-            headers = {"Authorization": f"Token {api_token}"}
+            # Materialized only on click, not on every rerun of the tab
+            uids_for_download = st.session_state.filtered_projects_df['UID'].to_numpy()
+            names_for_download = st.session_state.filtered_projects_df['Name'].to_numpy()
+            http_session = kobo_api.get_session(api_token) # Shared keep-alive session; already sends the token header
             zip_buffer_xls = io.BytesIO()
             progress_text_xls_dl_all = st.empty()
             progress_bar_xls_dl_all = st.progress(0)
+            last_ui = 0.0
             
-            with zipfile.ZipFile(zip_buffer_xls, 'w') as zipf_xls:
-                for i, uid in enumerate(uids_for_download):
+            # Requests run in a thread pool; the ZIP, progress and warnings are only touched here on the main thread
+            # Fast deflate: the binary XLS files only shrink moderately, so a higher level is not worth the CPU
+            with zipfile.ZipFile(zip_buffer_xls, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf_xls, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=kobo_api.MAX_WORKERS) as ex:
+                futures = {
+                    # The session defaults to Accept: application/json
+                    ex.submit(http_session.get, f"{server_url}/api/v2/assets/{uid}.xls", headers={"Accept": "*/*"}, timeout=10): i
+                    for i, uid in enumerate(uids_for_download)
+                }
+                for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                    i = futures.pop(future) # Drop the finished future so its result can be freed once written
+                    uid = uids_for_download[i]
                     form_name_info = names_for_download[i] 
-                    clean_form_name = form_name_info.replace("/", "_").replace("\\", "_").replace(":", "_").replace("*", "_").replace("?", "_").replace('"', "_").replace("<", "_").replace(">", "_").replace("|", "_")
-                    
-                    xls_url = f"{server_url}/api/v2/assets/{uid}.xls" 
+                    clean_form_name = form_name_info.translate(FILENAME_TRANSLATION)
                     
-                    progress_text_xls_dl_all.text(f"Downloading XLS for '{clean_form_name}' ({i+1}/{len(uids_for_download)})...")
-                    progress_bar_xls_dl_all.progress((i + 1) / len(uids_for_download))
+                    if kobo_api.progress_due(last_ui, final=done == len(uids_for_download)):
+                        progress_text_xls_dl_all.text(f"Downloaded XLS for '{clean_form_name}' ({done}/{len(uids_for_download)})...")
+                        progress_bar_xls_dl_all.progress(done / len(uids_for_download))
+                        last_ui = time.monotonic()
                     
                     try:
-                        xls_res = requests.get(xls_url, headers=headers, timeout=10)
+                        xls_res = future.result()
                         xls_res.raise_for_status()
                         if xls_res.status_code == 200:
                             zipf_xls.writestr(f"{clean_form_name}_{uid}.xls", xls_res.content)
@@ -824,27 +1231,47 @@ with tab4:
         st.info("This will download the raw JSON submission data (flattened) for each project currently displayed/filtered. Each form's data will be a separate JSON file in a ZIP archive.")
 
         if st.button("Download All Displayed JSON Submissions (ZIP)", key="dl_all_json_submissions_displayed"):
-            headers = {"Authorization": f"Token {api_token}"}
+            uids_for_download = st.session_state.filtered_projects_df['UID'].to_numpy()
+            names_for_download = st.session_state.filtered_projects_df['Name'].to_numpy()
             zip_buffer_json_submissions = io.BytesIO()
             progress_text_json_dl_all = st.empty()
             progress_bar_json_dl_all = st.progress(0)
+            last_ui = 0.0
             
             st.warning("Downloading raw JSON submission data can be slow for large datasets. Data will be flattened from Kobo's API response.")
-            with zipfile.ZipFile(zip_buffer_json_submissions, 'w') as zipf_json_sub:
-                for i, uid in enumerate(uids_for_download):
+            # fetch_submissions_frame makes no Streamlit calls, so the forms are fetched in a thread pool;
+            # errors come back through the futures and are reported here on the main thread.
+            # Each form pages serially (max_workers=1), keeping the export at MAX_WORKERS requests in flight
+            # JSON text compresses well, so it gets a slightly higher deflate level
+            with zipfile.ZipFile(zip_buffer_json_submissions, 'w', zipfile.ZIP_DEFLATED, compresslevel=3) as zipf_json_sub, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=kobo_api.MAX_WORKERS) as ex:
+                futures = {
+                    ex.submit(kobo_api.fetch_submissions_frame, uid, api_token, server_url, max_workers=1): i
+                    for i, uid in enumerate(uids_for_download)
+                }
+                for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                    i = futures.pop(future) # Drop the finished future so its result can be freed once written
+                    uid = uids_for_download[i]
                     form_name_info = names_for_download[i]
-                    clean_form_name = form_name_info.replace("/", "_").replace("\\", "_").replace(":", "_").replace("*", "_").replace("?", "_").replace('"', "_").replace("<", "_").replace(">", "_").replace("|", "_")
+                    clean_form_name = form_name_info.translate(FILENAME_TRANSLATION)
                     
-                    progress_text_json_dl_all.text(f"Downloading JSON submissions for '{clean_form_name}' ({i+1}/{len(uids_for_download)})...")
-                    progress_bar_json_dl_all.progress((i + 1) / len(uids_for_download))
+                    if kobo_api.progress_due(last_ui, final=done == len(uids_for_download)):
+                        progress_text_json_dl_all.text(f"Downloaded JSON submissions for '{clean_form_name}' ({done}/{len(uids_for_download)})...")
+                        progress_bar_json_dl_all.progress(done / len(uids_for_download))
+                        last_ui = time.monotonic()
                     
-                    submissions_df = kobo_api.fetch_submissions_data_from_v2_json(uid, api_token, server_url)
+                    try:
+                        submissions_df = future.result()
+                    except Exception as e:
+                        st.warning(f"Error fetching JSON submissions for {uid} ({clean_form_name}): {e}")
+                        submissions_df = None
                     
                     if submissions_df is not None and not submissions_df.empty:
-                        json_output_str = submissions_df.to_json(orient="records", indent=4)
+                        json_output_str = submissions_to_json(submissions_df)
                         zipf_json_sub.writestr(f"{clean_form_name}_{uid}_submissions.json", json_output_str)
                     else:
                         st.info(f"No submissions or failed to fetch for '{clean_form_name}' (UID: {uid}). Skipping JSON export for this form.")
+                    del future, submissions_df # Only the compressed copy in the ZIP is kept
                         
             zip_buffer_json_submissions.seek(0)
             progress_text_json_dl_all.text("✅ All displayed JSON submissions downloaded.")